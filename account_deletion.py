@@ -0,0 +1,179 @@
+"""Account deletion.
+
+delete_account() first scrubs the user row (credentials, username, email)
+so the account is unusable right away, then purges dependent rows with
+set-based DELETE/UPDATE statements in small batches, committing between
+batches so no table stays locked for long. Users with many rows are purged
+in a background thread. Places the user added stay in the catalogue with
+user_id set to NULL; ratings, routes and favorites are removed. Uploaded
+images that nothing references any more are deleted from disk.
+
+If a worker dies half way, ``flask purge-accounts`` finishes the job.
+"""
+import threading
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select, delete, update, func
+
+import change_feed
+import translations
+import user_stats
+from storage import get_storage
+from ratings import refresh_place_ratings
+from models import db, User, Place, Rating, PlannedRoute, Route, Favorite, favorites_table, planned_routes_table
+
+BATCH_SIZE = 500
+BACKGROUND_THRESHOLD = 2000
+
+DELETED_EMAIL_DOMAIN = "deleted.invalid"
+# registration rejects usernames with this prefix, so scrubbed names never collide
+DELETED_USERNAME_PREFIX = "deleted-"
+
+
+def _dependent_row_count(user_id):
+    counts = [
+        select(func.count()).select_from(Rating).where(Rating.user_id == user_id),
+        select(func.count()).select_from(PlannedRoute).where(PlannedRoute.user_id == user_id),
+        select(func.count()).select_from(favorites_table).where(favorites_table.c.user_id == user_id),
+        select(func.count()).select_from(Place).where(Place.user_id == user_id),
+    ]
+    return sum(db.session.scalar(query) for query in counts)
+
+
+def _scrub_user(user_id):
+    db.session.execute(
+        update(User).where(User.id == user_id).values(
+            username=f"{DELETED_USERNAME_PREFIX}{user_id}",
+            email=f"deleted-{user_id}@{DELETED_EMAIL_DOMAIN}",
+            password_hash="!",
+            is_admin=False,
+            cache_version=User.cache_version + 1,
+        )
+    )
+    db.session.commit()
+
+
+def _delete_in_batches(model, *where):
+    """DELETE rows of an id-keyed model in BATCH_SIZE chunks, one commit each."""
+    while True:
+        ids = db.session.scalars(select(model.id).where(*where).limit(BATCH_SIZE)).all()
+        if not ids:
+            return
+        db.session.execute(delete(model).where(model.id.in_(ids)))
+        if model in change_feed.TRACKED:
+            change_feed.record_changes(change_feed.TRACKED[model], ids, change_feed.DELETE)
+        db.session.commit()
+
+
+def _delete_link_rows(table, user_id):
+    """Same for the (user_id, place_id) association tables."""
+    while True:
+        place_ids = db.session.scalars(
+            select(table.c.place_id).where(table.c.user_id == user_id).limit(BATCH_SIZE)
+        ).all()
+        if not place_ids:
+            return
+        db.session.execute(delete(table).where(table.c.user_id == user_id, table.c.place_id.in_(place_ids)))
+        if table is favorites_table:
+            change_feed.record_changes("favorite", [f"{user_id}:{place_id}" for place_id in place_ids],
+                                       change_feed.DELETE)
+        db.session.commit()
+
+
+def remove_unreferenced_uploads(filenames):
+    """Delete upload files that no Place or Rating points at any more."""
+    filenames = {name for name in filenames if name}
+    if not filenames:
+        return 0
+    still_used = set(db.session.scalars(select(Place.image).where(Place.image.in_(filenames))))
+    still_used |= set(db.session.scalars(select(Rating.image).where(Rating.image.in_(filenames))))
+
+    storage = get_storage()
+    removed = 0
+    for name in filenames - still_used:
+        try:
+            removed += bool(storage.delete(name))
+        except Exception as e:
+            current_app.logger.warning("Could not remove upload %s: %s", name, e)
+    return removed
+
+
+def purge_user(user_id):
+    """Remove everything that belongs to a (scrubbed) user, then the user row."""
+    images = set()
+    while True:
+        rows = db.session.execute(
+            select(Rating.id, Rating.place_id, Rating.image).where(Rating.user_id == user_id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        images.update(row.image for row in rows if row.image)
+        translations.forget_ratings([row.id for row in rows])
+        db.session.execute(delete(Rating).where(Rating.id.in_([row.id for row in rows])))
+        change_feed.record_changes("rating", [row.id for row in rows], change_feed.DELETE)
+        refresh_place_ratings([row.place_id for row in rows])
+        db.session.commit()
+
+    _delete_in_batches(PlannedRoute, PlannedRoute.user_id == user_id)
+    _delete_in_batches(Route, Route.user_id == user_id)
+    _delete_in_batches(Favorite, Favorite.user_id == user_id)
+    _delete_link_rows(favorites_table, user_id)
+    _delete_link_rows(planned_routes_table, user_id)
+
+    # Places are shared content: keep them, but drop the owner
+    while True:
+        ids = db.session.scalars(select(Place.id).where(Place.user_id == user_id).limit(BATCH_SIZE)).all()
+        if not ids:
+            break
+        db.session.execute(update(Place).where(Place.id.in_(ids)).values(user_id=None))
+        change_feed.record_changes("place", ids, change_feed.UPDATE)
+        db.session.commit()
+
+    user_stats.forget_user(user_id)
+    db.session.execute(delete(User).where(User.id == user_id))
+    db.session.commit()
+
+    removed = remove_unreferenced_uploads(images)
+    current_app.logger.info("Purged user %s (%s upload files removed)", user_id, removed)
+
+
+def _purge_in_background(app, user_id):
+    with app.app_context():
+        try:
+            purge_user(user_id)
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Background purge of user %s failed", user_id)
+
+
+def delete_account(user_id, background=None):
+    """Make the account unusable now and remove its data.
+
+    Returns True when the purge was handed to a background thread.
+    """
+    if background is None:
+        background = _dependent_row_count(user_id) > current_app.config.get(
+            "ACCOUNT_DELETION_BACKGROUND_THRESHOLD", BACKGROUND_THRESHOLD)
+
+    _scrub_user(user_id)
+
+    if background:
+        app = current_app._get_current_object()
+        threading.Thread(target=_purge_in_background, args=(app, user_id), daemon=True).start()
+    else:
+        purge_user(user_id)
+    return background
+
+
+@click.command("purge-accounts")
+@with_appcontext
+def purge_accounts_command():
+    """Finish purging accounts whose deletion was interrupted."""
+    user_ids = db.session.scalars(
+        select(User.id).where(User.email.like(f"%@{DELETED_EMAIL_DOMAIN}"))
+    ).all()
+    for user_id in user_ids:
+        purge_user(user_id)
+    click.echo(f"Purged {len(user_ids)} account(s).")
@@ -0,0 +1,58 @@
+from flask import Blueprint, request, jsonify, abort, url_for
+from flask_login import login_required, current_user
+
+import bulk_ops
+
+admin_bp = Blueprint('admin_bp', __name__, url_prefix='/admin')
+
+
+@admin_bp.before_request
+@login_required
+def require_admin():
+    if not current_user.is_admin:
+        abort(403)
+
+
+def _filters(source):
+    rating_below = source.get("rating_below")
+    return {
+        "region": source.get("region") or None,
+        "category": source.get("category") or None,
+        "user_id": int(source["user_id"]) if source.get("user_id") else None,
+        "rating_below": float(rating_below) if rating_below not in (None, "") else None,
+        "no_coordinates": str(source.get("no_coordinates", "")).lower() in ("1", "true", "on"),
+    }
+
+
+# ------------------- Bulk place operations -------------------
+@admin_bp.route('/places/preview')
+def preview_places():
+    try:
+        clauses = bulk_ops.place_filters(**_filters(request.args))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify(bulk_ops.preview(clauses))
+
+
+@admin_bp.route('/places/bulk', methods=['POST'])
+def bulk_places():
+    data = request.get_json(silent=True) or request.form
+    action = data.get("action")
+    if action not in bulk_ops.ACTIONS:
+        return jsonify({"status": "error", "message": "Unknown action"}), 400
+    if action != bulk_ops.DELETE and not data.get("value"):
+        return jsonify({"status": "error", "message": "A value is required"}), 400
+    try:
+        job_id = bulk_ops.start_job(action, _filters(data), data.get("value"))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "started", "job": job_id,
+                    "progress_url": url_for('admin_bp.bulk_job', job_id=job_id)}), 202
+
+
+@admin_bp.route('/places/bulk/<job_id>')
+def bulk_job(job_id):
+    job = bulk_ops.get_job(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job)
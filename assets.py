@@ -0,0 +1,161 @@
+"""Fingerprinted, precompressed static assets.
+
+``flask build-assets`` copies every file under static/ (except uploads) to
+static/dist/ with a content hash in its name, writes .gz (and .br, when the
+optional brotli package is installed) next to text assets, and records the
+mapping in static/dist/manifest.json. Run it at deploy time.
+
+When the manifest exists, ``url_for('static', filename='css/index.css')``
+returns the fingerprinted URL, and those files are served with
+``Cache-Control: public, max-age=31536000, immutable`` plus the best
+precompressed variant the client accepts. Without a manifest (development)
+URLs and caching are unchanged. Old builds are left in place so pages cached
+before a deploy keep working.
+
+Config:
+    ASSET_MANIFEST   path of the manifest (default static/dist/manifest.json);
+                     None disables fingerprinting
+"""
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import with_appcontext
+
+import compression
+
+DIST_DIR = "dist"
+SKIP_DIRS = {DIST_DIR, "uploads"}
+TEXT_EXTENSIONS = {".css", ".js", ".svg", ".txt", ".json", ".map", ".html"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def _source_files(static_folder):
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if not (root == static_folder and d in SKIP_DIRS))
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, static_folder).replace(os.sep, "/"), path
+
+
+def _rewrite_css_urls(name, css, manifest):
+    """Point relative url(...) references in a stylesheet at the built files."""
+    base = posixpath.dirname(name)
+
+    def replace(match):
+        quote, ref = match.groups()
+        if ref.startswith(("data:", "http:", "https:", "//", "/", "#")):
+            return match.group(0)
+        path, suffix = re.match(r"([^?#]*)(.*)", ref).groups()
+        built = manifest.get(posixpath.normpath(posixpath.join(base, path)))
+        if built is None:
+            return match.group(0)
+        relative = posixpath.relpath(built, posixpath.join(DIST_DIR, base))
+        return f"url({quote}{relative}{suffix}{quote})"
+
+    return CSS_URL.sub(replace, css)
+
+
+def _write_built(dist, name, data):
+    """Write data under its fingerprinted name (plus .gz/.br for text); returns that name."""
+    stem, extension = os.path.splitext(name)
+    built = f"{stem}.{hashlib.md5(data).hexdigest()[:10]}{extension}"
+    target = os.path.join(dist, built)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+        if extension.lower() in TEXT_EXTENSIONS:
+            for encoding, suffix in (("gzip", ".gz"), ("br", ".br")):
+                if encoding not in compression.available_encodings():
+                    continue
+                compressed = compression.compress(data, encoding)
+                if len(compressed) < len(data):
+                    with open(target + suffix, "wb") as f:
+                        f.write(compressed)
+    return f"{DIST_DIR}/{built}"
+
+
+def build(static_folder):
+    """Write fingerprinted and precompressed copies; returns the manifest.
+
+    Stylesheets are built last, with their url(...) references rewritten to
+    the fingerprinted images and fonts (so their hash changes with them).
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+    stylesheets = []
+    for name, path in _source_files(static_folder):
+        if name.lower().endswith(".css"):
+            stylesheets.append((name, path))
+            continue
+        with open(path, "rb") as f:
+            manifest[name] = _write_built(dist, name, f.read())
+    for name, path in stylesheets:
+        with open(path, encoding="utf-8") as f:
+            css = _rewrite_css_urls(name, f.read(), manifest)
+        manifest[name] = _write_built(dist, name, css.encode("utf-8"))
+
+    tmp = os.path.join(dist, "manifest.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(dist, "manifest.json"))
+    return manifest
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def serve_static(filename):
+    """Static view: immutable caching and precompressed variants for built assets."""
+    app = current_app
+    if not filename.startswith(DIST_DIR + "/"):
+        return app.send_static_file(filename)
+
+    static_folder = app.static_folder
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(static_folder, filename + suffix)):
+            response = send_from_directory(static_folder, filename + suffix, max_age=31536000)
+            response.headers["Content-Encoding"] = encoding
+            # the type of the original file, not of the .gz/.br
+            response.mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            break
+    else:
+        response = send_from_directory(static_folder, filename, max_age=31536000)
+    response.headers["Cache-Control"] = IMMUTABLE
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def init_app(app):
+    app.config.setdefault("ASSET_MANIFEST", os.path.join(app.static_folder, DIST_DIR, "manifest.json"))
+    manifest = load_manifest(app.config["ASSET_MANIFEST"]) if app.config["ASSET_MANIFEST"] else {}
+    app.extensions["asset_manifest"] = manifest
+
+    if manifest:
+        @app.url_defaults
+        def fingerprinted_static_url(endpoint, values):
+            if endpoint == "static":
+                values["filename"] = manifest.get(values.get("filename"), values.get("filename"))
+
+    app.view_functions["static"] = serve_static
+    app.cli.add_command(build_assets_command)
+
+
+@click.command("build-assets")
+@with_appcontext
+def build_assets_command():
+    """Fingerprint and precompress static files into static/dist."""
+    manifest = build(current_app.static_folder)
+    click.echo(f"Built {len(manifest)} asset(s).")
@@ -2,14 +2,18 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from models import db, User
 from forms import RegistrationForm, LoginForm
+from ratelimit import limiter
+from user_cache import user_cache
+from account_deletion import delete_account as purge_account
 
 auth_bp = Blueprint('auth_bp', __name__, template_folder='templates')
 
 # ------------------- Registration -------------------
 @auth_bp.route('/register', methods=['GET', 'POST'])
+@limiter.limit("10/hour", methods=["POST"])
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for('home'))
+        return redirect(url_for('main_bp.home'))
 
     form = RegistrationForm()
 
@@ -44,9 +48,10 @@ def register():
 
 # ------------------- Login -------------------
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@limiter.limit("10/minute", methods=["POST"])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for('home'))
+        return redirect(url_for('main_bp.home'))
 
     form = LoginForm()
     if form.validate_on_submit():
@@ -55,7 +60,7 @@ def login():
             login_user(user)
             flash('Login successful!', 'success')
             next_page = request.args.get('next')
-            return redirect(next_page or url_for('home'))
+            return redirect(next_page or url_for('main_bp.home'))
         flash('Invalid email or password.', 'danger')
 
     return render_template('auth.html', form=form)
@@ -67,21 +72,22 @@ def login():
 def logout():
     logout_user()
     flash('Logged out successfully.', 'success')
-    return redirect(url_for('index'))
+    return redirect(url_for('main_bp.index'))
 
 
 # ------------------- Delete Account -------------------
 @auth_bp.route('/delete-account', methods=['POST'])
 @login_required
 def delete_account():
-    user = current_user
+    user_id = current_user.id
 
     # logout FIRST (important)
     logout_user()
 
-    # delete user
-    db.session.delete(user)
-    db.session.commit()
+    # scrub the account now, remove its data in batches
+    # (scrubbing bumps the cache version; drop this worker's copy too)
+    purge_account(user_id)
+    user_cache.forget(user_id)
 
     flash('Your account has been permanently deleted.', 'info')
-    return redirect(url_for('index'))
+    return redirect(url_for('main_bp.index'))
@@ -0,0 +1,98 @@
+"""Synthetic data for the benchmark harness.
+
+Fills the configured database with N places spread over every region and
+category, plus users, ratings, favorites and planned routes. Rows are
+inserted in chunks with Core inserts so 100k places take seconds, not
+minutes.
+"""
+import random
+from datetime import date, datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from forms import CATEGORY_CHOICES, REGION_CHOICES
+from models import db, User, Place, Rating, PlannedRoute, PlaceTranslation, favorites_table
+from ratings import refresh_place_ratings
+import change_feed
+import user_stats
+
+CHUNK = 5000
+
+# Rough bounding box of Georgia
+LAT_RANGE = (41.05, 43.55)
+LON_RANGE = (40.05, 46.65)
+
+WORDS = ["Lake", "Canyon", "Peak", "Waterfall", "Monastery", "Forest", "Valley",
+         "Cave", "Tower", "Ridge", "Trail", "Fortress", "Meadow", "Gorge"]
+
+
+def _insert(table, rows):
+    for start in range(0, len(rows), CHUNK):
+        db.session.execute(table.insert(), rows[start:start + CHUNK])
+
+
+def generate(n_places, n_users=None, ratings_per_place=3, favorites_per_user=20,
+             routes_per_user=3, seed=0):
+    """Populate the current app's database. Returns a dict of row counts."""
+    rnd = random.Random(seed)
+    n_users = n_users or max(10, n_places // 50)
+
+    password_hash = generate_password_hash("benchmark")
+    users = [
+        {"id": i, "username": f"user{i}", "email": f"user{i}@gmail.com",
+         "password_hash": password_hash, "role": "user", "is_admin": i == 1}
+        for i in range(1, n_users + 1)
+    ]
+    _insert(User.__table__, users)
+
+    categories = [code for code, _ in CATEGORY_CHOICES]
+    regions = [code for code, _ in REGION_CHOICES]
+    places = []
+    for i in range(1, n_places + 1):
+        has_coords = rnd.random() > 0.05
+        places.append({
+            "id": i,
+            "name": f"{rnd.choice(WORDS)} {rnd.choice(WORDS)} {i}",
+            "description": " ".join(rnd.choice(WORDS).lower() for _ in range(30)),
+            "category": categories[i % len(categories)],
+            "region": regions[i % len(regions)],
+            "image": "placeholder.png",
+            "latitude": rnd.uniform(*LAT_RANGE) if has_coords else None,
+            "longitude": rnd.uniform(*LON_RANGE) if has_coords else None,
+            "user_id": rnd.randint(1, n_users),
+        })
+    _insert(Place.__table__, places)
+    change_feed.touch("place")
+    _insert(PlaceTranslation.__table__, [
+        {"place_id": p["id"], "lang": "en", "name": p["name"] + " (en)", "description": p["description"]}
+        for p in places
+    ])
+
+    now = datetime.utcnow()
+    # at most one rating per user and place
+    ratings = [
+        {"user_id": user_id, "place_id": place_id,
+         "stars": float(rnd.randint(0, 5)), "comment": f"comment {place_id}",
+         "image": None, "timestamp": now - timedelta(minutes=rnd.randint(0, 100000))}
+        for place_id in range(1, n_places + 1)
+        for user_id in rnd.sample(range(1, n_users + 1), min(n_users, rnd.randint(0, ratings_per_place * 2)))
+    ]
+    _insert(Rating.__table__, ratings)
+    refresh_place_ratings()
+
+    favorites = []
+    routes = []
+    today = date.today()
+    for user_id in range(1, n_users + 1):
+        for place_id in rnd.sample(range(1, n_places + 1), min(favorites_per_user, n_places)):
+            favorites.append({"user_id": user_id, "place_id": place_id})
+        for _ in range(routes_per_user):
+            routes.append({"user_id": user_id, "place_id": rnd.randint(1, n_places),
+                           "date": today + timedelta(days=rnd.randint(1, 90))})
+    _insert(favorites_table, favorites)
+    _insert(PlannedRoute.__table__, routes)
+    user_stats.rebuild_all()
+
+    db.session.commit()
+    return {"users": len(users), "places": len(places), "ratings": len(ratings),
+            "favorites": len(favorites), "routes": len(routes)}
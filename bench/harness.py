@@ -0,0 +1,205 @@
+"""Benchmark harness for the hot routes.
+
+Builds a throw-away SQLite database per run, fills it with bench.datagen and
+drives the routes through the Flask test client with the testing config
+(no CSRF, no rate limits, no translation calls).
+For every dataset size it reports p50/p95 latency, SQL queries per request
+and peak Python memory per route.
+
+    python -m bench.harness                              # 1k / 10k / 100k places
+    python -m bench.harness --sizes 1000 --save bench/baselines/local.json
+    python -m bench.harness --sizes 1000 --compare bench/baselines/local.json
+
+--compare exits with status 1 when a route got slower than the tolerance or
+issues more queries than the baseline did.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import event
+
+from forms import CATEGORY_CHOICES, REGION_CHOICES
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def build_routes(n_places):
+    """(label, method, url factory) for every route we measure."""
+    category = CATEGORY_CHOICES[0][0]
+    region = REGION_CHOICES[0][0]
+    pick = lambda: random.randint(1, n_places)
+    return [
+        ("index", "GET", lambda: "/"),
+        ("home", "GET", lambda: "/home"),
+        ("categories", "GET", lambda: "/categories"),
+        ("categories:category", "GET", lambda: f"/categories?category={category}"),
+        ("categories:region", "GET", lambda: f"/categories?region={region}"),
+        ("categories:rating", "GET", lambda: "/categories?rating=4"),
+        ("categories:search", "GET", lambda: "/categories?q=Lake"),
+        ("categories:favorites", "GET", lambda: "/categories?favorites_only=on"),
+        ("categories:page", "GET", lambda: "/categories?page=3"),
+        ("map", "GET", lambda: "/map"),
+        ("map:points", "GET", lambda: "/map/points"),
+        ("place_detail", "GET", lambda: f"/place/{pick()}"),
+        ("toggle_favorite", "POST", lambda: f"/toggle_favorite/{pick()}"),
+    ]
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure_route(client, counter, method, make_url, requests):
+    timings = []
+    queries = []
+    for _ in range(requests):
+        url = make_url()
+        counter.count = 0
+        start = time.perf_counter()
+        response = client.open(url, method=method)
+        timings.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+        if response.status_code >= 500:
+            raise RuntimeError(f"{method} {url} returned {response.status_code}")
+
+    # Memory is measured on a separate request so tracemalloc overhead
+    # does not leak into the latency numbers.
+    tracemalloc.start()
+    client.open(make_url(), method=method)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": round(percentile(timings, 50), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "queries": round(statistics.mean(queries), 1),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def run(sizes, requests, lang, seed):
+    tmpdir = tempfile.mkdtemp(prefix="greenspots-bench-")
+    os.environ["TEST_DATABASE_URL"] = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+
+    from app import create_app
+    from models import db
+    from bench.datagen import generate
+
+    app = create_app("testing")
+
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+
+    results = {}
+    for size in sizes:
+        random.seed(seed)
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            started = time.perf_counter()
+            counts = generate(size, seed=seed)
+        print(f"[{size}] generated {counts} in {time.perf_counter() - started:.1f}s")
+
+        # Requests run outside the app context above so each one gets its own
+        # session, like in production; otherwise the identity map hides queries.
+        client = app.test_client()
+        client.set_cookie("lang", lang)
+        with client.session_transaction() as sess:
+            sess["_user_id"] = "1"
+            sess["_fresh"] = True
+
+        results[str(size)] = {}
+        for label, method, make_url in build_routes(size):
+            stats = measure_route(client, counter, method, make_url, requests)
+            results[str(size)][label] = stats
+            print(f"[{size}] {label:<22} p50 {stats['p50_ms']:>9.2f}ms  "
+                  f"p95 {stats['p95_ms']:>9.2f}ms  queries {stats['queries']:>7}  "
+                  f"peak {stats['peak_kb']:>10.1f}KB")
+
+    with app.app_context():
+        db.drop_all()
+
+    return {
+        "meta": {
+            "created": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": requests,
+            "lang": lang,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Return a list of human readable regressions."""
+    regressions = []
+    for size, routes in current["results"].items():
+        for label, stats in routes.items():
+            base = baseline.get("results", {}).get(size, {}).get(label)
+            if not base:
+                continue
+            if stats["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                regressions.append(f"[{size}] {label}: p95 {base['p95_ms']}ms -> {stats['p95_ms']}ms")
+            if stats["queries"] > base["queries"]:
+                regressions.append(f"[{size}] {label}: queries {base['queries']} -> {stats['queries']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GreenSpots route benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="number of places to generate for each run")
+    parser.add_argument("--requests", type=int, default=20, help="requests per route")
+    parser.add_argument("--lang", default="ge", choices=["ge", "en"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed p95 slowdown before --compare fails (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    current = run(args.sizes, args.requests, args.lang, args.seed)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as fh:
+            json.dump(current, fh, indent=2)
+        print(f"Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print("No regressions against", args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Startup time and worker memory.
+
+Every run starts a fresh interpreter that imports the app and calls
+create_app(), then forks a "worker" the way gunicorn --preload does and
+reports what that worker has to pay for on its own:
+
+    import_ms / create_ms   time to import app.py and to build the app
+    rss_kb                  resident memory of the process after create_app()
+    worker_kb               memory private to a forked worker after a GC pass
+                            (without gc.freeze(), as without gunicorn.conf.py)
+    worker_frozen_kb        the same with gc.freeze() before the fork
+    heavy                   optional heavy modules that got imported
+
+    python -m bench.startup                       # production config, 5 runs
+    python -m bench.startup --runs 10 --config development
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY_MODULES = ("alembic", "deep_translator", "requests", "boto3", "redis", "brotli")
+
+
+def _memory_kb(field):
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return None
+
+
+def _private_kb():
+    total = 0
+    with open("/proc/self/smaps_rollup") as rollup:
+        for line in rollup:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                total += int(line.split()[1])
+    return total
+
+
+def _forked_worker_kb(freeze):
+    """Private memory of a forked child once the GC has walked its heap."""
+    if freeze:
+        gc.freeze()
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        gc.collect()
+        os.write(write_end, str(_private_kb()).encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    os.close(write_end)
+    value = int(os.read(read_end, 64))
+    os.close(read_end)
+    if freeze:
+        gc.unfreeze()
+    return value
+
+
+def measure_once(config):
+    """Runs in the child interpreter; prints one JSON line."""
+    started = time.perf_counter()
+    from app import create_app
+    imported = time.perf_counter()
+    create_app(config)
+    created = time.perf_counter()
+
+    result = {
+        "import_ms": (imported - started) * 1000,
+        "create_ms": (created - imported) * 1000,
+        "rss_kb": _memory_kb("VmRSS"),
+        "heavy": [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+    if hasattr(os, "fork") and os.path.exists("/proc/self/smaps_rollup"):
+        result["worker_kb"] = _forked_worker_kb(freeze=False)
+        result["worker_frozen_kb"] = _forked_worker_kb(freeze=True)
+    print(json.dumps(result))
+
+
+def run(runs, config):
+    env = dict(os.environ)
+    env.setdefault("SECRET_KEY", "startup-bench")
+    env.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="greenspots-startup-"), "startup.db"))
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-m", "bench.startup", "--child", "--config", config],
+                                cwd=root, env=env, capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{config} config, median of {runs} run(s):")
+    for key in ("import_ms", "create_ms", "rss_kb", "worker_kb", "worker_frozen_kb"):
+        values = [sample[key] for sample in samples if key in sample]
+        if values:
+            print(f"  {key:<18}{statistics.median(values):>10.1f}")
+    print(f"  {'heavy':<18}{', '.join(samples[-1]['heavy']) or '-':>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--config", default="production")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        measure_once(args.config)
+    else:
+        run(args.runs, args.config)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Bulk moderation of places.
+
+Select places by filter, preview what would be touched, then delete,
+recategorize or re-region them in batches of BATCH_SIZE places, one short
+transaction per batch, so cleaning up spam never holds the tables for long.
+
+Deleting a place also removes, in the same batch, its ratings (and their
+translations), favorites, planned routes and translations; the counters of
+every affected user are adjusted and upload files nothing references any
+more are deleted once the batch is committed.
+
+Used by the admin endpoints in admin.py and by ``flask bulk-places``.
+"""
+import threading
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select, delete, update, func, distinct, or_
+
+import change_feed
+import translations
+import user_stats
+from account_deletion import remove_unreferenced_uploads
+from user_cache import user_cache
+from models import (db, Place, Rating, PlannedRoute, Favorite, RatingTranslation, BulkJob,
+                    favorites_table, planned_routes_table)
+
+BATCH_SIZE = 200
+
+DELETE = "delete"
+SET_CATEGORY = "set_category"
+SET_REGION = "set_region"
+ACTIONS = (DELETE, SET_CATEGORY, SET_REGION)
+
+# a running job whose thread hasn't reported for this long is taken as dead
+JOB_TIMEOUT = timedelta(minutes=10)
+
+
+def place_filters(region=None, category=None, user_id=None, rating_below=None, no_coordinates=False):
+    """WHERE clauses for the selected places. At least one filter is required.
+
+    rating_below only matches rated places: unrated ones (rating NULL) are
+    never selected by it, so cleaning up low ratings can't sweep up every
+    new place.
+    """
+    clauses = []
+    if region:
+        clauses.append(Place.region == region)
+    if category:
+        clauses.append(Place.category == category)
+    if user_id:
+        clauses.append(Place.user_id == user_id)
+    if rating_below is not None:
+        clauses.append(Place.rating < rating_below)
+    if no_coordinates:
+        clauses.append(or_(Place.latitude.is_(None), Place.longitude.is_(None)))
+    if not clauses:
+        raise ValueError("Select places with at least one filter")
+    return clauses
+
+
+def preview(clauses):
+    """How many places and dependent rows the selection covers."""
+    selected = select(Place.id).where(*clauses)
+    return {
+        "places": db.session.scalar(select(func.count()).select_from(selected.subquery())),
+        "ratings": db.session.scalar(select(func.count(Rating.id)).where(Rating.place_id.in_(selected))),
+        "favorites": db.session.scalar(select(func.count()).select_from(favorites_table)
+                                       .where(favorites_table.c.place_id.in_(selected))),
+        "planned_routes": db.session.scalar(select(func.count(PlannedRoute.id))
+                                            .where(PlannedRoute.place_id.in_(selected))),
+        "users": db.session.scalar(select(func.count(distinct(Place.user_id))).where(*clauses)),
+    }
+
+
+def delete_places(place_ids):
+    """Delete places with everything that hangs off them; the caller commits.
+
+    Returns the upload files the deleted rows referenced.
+    """
+    if not place_ids:
+        return set()
+    ratings = db.session.execute(
+        select(Rating.id, Rating.user_id, Rating.stars, Rating.image).where(Rating.place_id.in_(place_ids))
+    ).all()
+    places = db.session.execute(select(Place.user_id, Place.image).where(Place.id.in_(place_ids))).all()
+    favorite_users = db.session.execute(
+        select(favorites_table.c.user_id, favorites_table.c.place_id).where(favorites_table.c.place_id.in_(place_ids))
+    ).all()
+    route_users = db.session.scalars(select(PlannedRoute.user_id).where(PlannedRoute.place_id.in_(place_ids))).all()
+    rating_ids = [row.id for row in ratings]
+
+    db.session.execute(delete(RatingTranslation).where(RatingTranslation.rating_id.in_(rating_ids)))
+    db.session.execute(delete(Rating).where(Rating.id.in_(rating_ids)))
+    db.session.execute(delete(favorites_table).where(favorites_table.c.place_id.in_(place_ids)))
+    db.session.execute(delete(planned_routes_table).where(planned_routes_table.c.place_id.in_(place_ids)))
+    db.session.execute(delete(Favorite).where(Favorite.place_id.in_(place_ids)))
+    route_ids = db.session.scalars(select(PlannedRoute.id).where(PlannedRoute.place_id.in_(place_ids))).all()
+    db.session.execute(delete(PlannedRoute).where(PlannedRoute.id.in_(route_ids)))
+    translations.forget_places(place_ids)
+    db.session.execute(delete(Place).where(Place.id.in_(place_ids)).execution_options(synchronize_session=False))
+
+    change_feed.record_changes("rating", rating_ids, change_feed.DELETE)
+    change_feed.record_changes("favorite", [f"{row.user_id}:{row.place_id}" for row in favorite_users],
+                               change_feed.DELETE)
+    change_feed.record_changes("planned_route", route_ids, change_feed.DELETE)
+    change_feed.record_changes("place", place_ids, change_feed.DELETE)
+    # counters of everyone affected, from the rows read above, in one UPDATE
+    deltas = defaultdict(Counter)
+    for row in ratings:
+        deltas[row.user_id]["ratings_given"] -= 1
+        deltas[row.user_id]["stars_given"] -= row.stars or 0
+    for row in places:
+        deltas[row.user_id]["places_added"] -= 1
+    for row in favorite_users:
+        deltas[row.user_id]["favorites"] -= 1
+    for user_id in route_users:
+        deltas[user_id]["planned_routes"] -= 1
+    user_stats.apply_deltas(deltas)
+    # their cached snapshots list the deleted favorites and routes
+    user_cache.invalidate(*[row.user_id for row in favorite_users], *route_users)
+
+    return {row.image for row in ratings if row.image} | {row.image for row in places if row.image}
+
+
+def _update_places(place_ids, **values):
+    # Core UPDATE skips the ORM revision bump, so do it here for the fragment caches
+    db.session.execute(update(Place).where(Place.id.in_(place_ids))
+                       .values(revision=Place.revision + 1, **values)
+                       .execution_options(synchronize_session=False))
+    change_feed.record_changes("place", place_ids, change_feed.UPDATE)
+
+
+def run(action, clauses, value=None, progress=None, batch_size=BATCH_SIZE):
+    """Apply action to every selected place, batch by batch.
+
+    progress(done, total) is called after each committed batch.
+    Returns the number of places processed.
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown action: {action}")
+    if action != DELETE and not value:
+        raise ValueError(f"{action} needs a value")
+
+    total = db.session.scalar(select(func.count(Place.id)).where(*clauses))
+    done = 0
+    last_id = 0
+    while True:
+        # keyset over ids, so updated rows that no longer match are not revisited
+        ids = db.session.scalars(
+            select(Place.id).where(*clauses, Place.id > last_id).order_by(Place.id).limit(batch_size)
+        ).all()
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        images = set()
+        if action == DELETE:
+            images = delete_places(ids)
+        elif action == SET_CATEGORY:
+            _update_places(ids, category=value)
+        else:
+            _update_places(ids, region=value)
+        db.session.commit()
+        remove_unreferenced_uploads(images)
+
+        done += len(ids)
+        if progress:
+            progress(done, total)
+
+    current_app.logger.info("Bulk %s of %s place(s) finished", action, done)
+    return done
+
+
+# ---------------- BACKGROUND JOBS ----------------
+# Job state lives in the bulk_job table, so a progress poll can be answered
+# by any worker, not only the one running the job. A job whose worker was
+# restarted stops reporting and is marked failed by the next poll.
+def _set_job(job_id, **values):
+    db.session.execute(update(BulkJob).where(BulkJob.id == job_id)
+                       .values(updated_at=datetime.utcnow(), **values))
+    db.session.commit()
+
+
+def start_job(action, filters, value=None):
+    """Run a bulk operation in a background thread; returns the job id."""
+    clauses = place_filters(**filters)
+    job_id = uuid.uuid4().hex[:12]
+    db.session.add(BulkJob(id=job_id, action=action, value=value, filters=filters, status="running", done=0))
+    db.session.commit()
+
+    def progress(done, total):
+        _set_job(job_id, done=done, total=total)
+
+    def work(app):
+        with app.app_context():
+            try:
+                run(action, clauses, value, progress=progress)
+                status, error = "finished", None
+            except Exception as e:
+                db.session.rollback()
+                app.logger.exception("Bulk %s failed", action)
+                status, error = "failed", str(e)
+            _set_job(job_id, status=status, error=error)
+
+    app = current_app._get_current_object()
+    threading.Thread(target=work, args=(app,), daemon=True).start()
+    return job_id
+
+
+def _fail_stale_job(job_id):
+    cutoff = datetime.utcnow() - JOB_TIMEOUT
+    result = db.session.execute(
+        update(BulkJob).where(BulkJob.id == job_id, BulkJob.status == "running", BulkJob.updated_at < cutoff)
+        .values(status="failed", error="The job stopped reporting progress (worker restarted?)"))
+    db.session.commit()
+    return result.rowcount
+
+
+def get_job(job_id):
+    job = db.session.get(BulkJob, job_id)
+    if job is None:
+        return None
+    if job.status == "running" and job.updated_at < datetime.utcnow() - JOB_TIMEOUT and _fail_stale_job(job_id):
+        db.session.refresh(job)
+    return {"id": job.id, "action": job.action, "value": job.value, "filters": job.filters,
+            "status": job.status, "done": job.done, "total": job.total, "error": job.error}
+
+
+@click.command("bulk-places")
+@click.option("--region")
+@click.option("--category")
+@click.option("--user-id", type=int)
+@click.option("--rating-below", type=float, help="Average rating below this (unrated places never match).")
+@click.option("--no-coordinates", is_flag=True)
+@click.option("--delete", "delete_", is_flag=True, help="Delete the places and their dependents.")
+@click.option("--set-category", help="Move the places to this category.")
+@click.option("--set-region", help="Move the places to this region.")
+@click.option("--yes", is_flag=True, help="Don't ask for confirmation.")
+@with_appcontext
+def bulk_places_command(region, category, user_id, rating_below, no_coordinates,
+                        delete_, set_category, set_region, yes):
+    """Preview, then delete / recategorize / re-region places matching filters."""
+    try:
+        clauses = place_filters(region, category, user_id, rating_below, no_coordinates)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    counts = preview(clauses)
+    click.echo(", ".join(f"{name}: {count}" for name, count in counts.items()))
+
+    chosen = [(action, value) for action, value in
+              ((DELETE, delete_), (SET_CATEGORY, set_category), (SET_REGION, set_region)) if value]
+    if not chosen:
+        return
+    if len(chosen) > 1:
+        raise click.UsageError("Choose one of --delete, --set-category, --set-region")
+    action, value = chosen[0]
+    if action == DELETE:
+        value = None
+    if not counts["places"] or not (yes or click.confirm(f"{action} {counts['places']} place(s)?")):
+        return
+
+    with click.progressbar(length=counts["places"], label=action) as bar:
+        seen = [0]
+
+        def progress(done, total):
+            bar.update(done - seen[0])
+            seen[0] = done
+
+        run(action, clauses, value, progress=progress)
@@ -0,0 +1,271 @@
+"""Change feed of catalogue writes.
+
+Every flush that inserts, updates or deletes a Place, Rating or PlannedRoute,
+or changes a user's favorites through the ORM, is turned into ChangeEvents.
+They are written to the change_outbox table in the same transaction, and
+handed to in-process subscribers once the transaction commits (never on
+rollback).
+
+Set-based writes that bypass the ORM unit of work (bulk DELETE/UPDATE, Core
+inserts into the favorites table) report their rows with record_changes().
+
+Subscribers react immediately inside the worker::
+
+    change_feed.subscribe(lambda event: ..., entities={"place"})
+
+Background consumers that must not miss anything read the outbox instead,
+each keeping its own cursor::
+
+    change_feed.consume("search-index", handle_batch)
+
+Outbox ids are handed out when a row is inserted, not when its transaction
+commits, so with concurrent writers a lower id can become visible after a
+higher one was consumed. The cursor remembers the ids it skipped and keeps
+re-checking them for GAP_TIMEOUT seconds; ids still missing by then belonged
+to transactions that rolled back.
+
+Outbox ids can't tell a reader whether anything changed since it last
+looked, for the same reason. Entities in VERSIONED also get a counter in
+entity_version that is bumped in the writing transaction, so it only ever
+grows in commit order; readers caching derived data compare version(entity).
+
+``flask prune-changes`` deletes outbox rows older than a few days.
+"""
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event, insert, select, update, delete, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import attributes
+
+from models import db, Place, Rating, PlannedRoute, User, ChangeOutbox, ChangeCursor, EntityVersion
+
+ChangeEvent = namedtuple("ChangeEvent", "entity id op revision")
+
+TRACKED = {Place: "place", Rating: "rating", PlannedRoute: "planned_route"}
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+
+# entities with a write counter in entity_version
+VERSIONED = frozenset({"place"})
+
+# longest a write transaction may stay open and still have its changes consumed
+GAP_TIMEOUT = 300
+
+_subscribers = []
+_subscribers_lock = threading.Lock()
+
+
+def subscribe(callback, entities=None):
+    """Call ``callback(event)`` for every committed change (optionally only some entities)."""
+    with _subscribers_lock:
+        _subscribers.append((callback, frozenset(entities) if entities else None))
+
+
+def unsubscribe(callback):
+    with _subscribers_lock:
+        _subscribers[:] = [(cb, entities) for cb, entities in _subscribers if cb is not callback]
+
+
+def _write_outbox(connection, changes):
+    """Insert (entity, id, op) rows into the outbox; returns the ChangeEvents."""
+    if not changes:
+        return []
+    now = datetime.utcnow()
+    rows = [{"entity": entity, "entity_id": str(entity_id), "op": op, "created_at": now}
+            for entity, entity_id, op in changes]
+    revisions = connection.execute(
+        insert(ChangeOutbox).returning(ChangeOutbox.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+    return [ChangeEvent(entity, str(entity_id), op, revision)
+            for (entity, entity_id, op), revision in zip(changes, revisions)]
+
+
+def _stage(session, changes):
+    """Write changes to the outbox and remember them until the transaction ends.
+
+    Events are tagged with the innermost transaction, so rolling back a
+    savepoint drops exactly the events written inside it.
+    """
+    connection = session.connection()
+    events = _write_outbox(connection, changes)
+    _bump_versions(connection, {entity for entity, _, _ in changes} & VERSIONED)
+    if events:
+        transaction = session.get_nested_transaction() or session.get_transaction()
+        pending = session.info.setdefault("change_feed_pending", [])
+        pending.extend((transaction, change) for change in events)
+
+
+def _bump_versions(connection, entities):
+    for entity in sorted(entities):
+        bump = update(EntityVersion).where(EntityVersion.entity == entity).values(value=EntityVersion.value + 1)
+        if connection.execute(bump).rowcount:
+            continue
+        try:
+            with connection.begin_nested():
+                connection.execute(insert(EntityVersion).values(entity=entity, value=1))
+        except IntegrityError:
+            # created concurrently
+            connection.execute(bump)
+
+
+def touch(entity, session=None):
+    """Bump the write counter after a write that isn't reported row by row."""
+    session = session or db.session()
+    _bump_versions(session.connection(), {entity} & VERSIONED)
+
+
+def version(entity):
+    """Write counter of an entity in VERSIONED (0 before its first write)."""
+    return db.session.scalar(select(EntityVersion.value).where(EntityVersion.entity == entity)) or 0
+
+
+def record_changes(entity, ids, op, session=None):
+    """Report rows changed by a set-based statement on the current session."""
+    session = session or db.session()
+    _stage(session, [(entity, entity_id, op) for entity_id in ids])
+
+
+def _history(obj, key):
+    # never load an attribute from inside a flush
+    return attributes.get_history(obj, key, passive=attributes.PASSIVE_NO_INITIALIZE)
+
+
+def _collect(session):
+    changes = []
+    for obj in session.new:
+        entity = TRACKED.get(type(obj))
+        if entity:
+            changes.append((entity, obj.id, INSERT))
+    for obj in session.dirty:
+        entity = TRACKED.get(type(obj))
+        if entity and session.is_modified(obj, include_collections=False):
+            changes.append((entity, obj.id, UPDATE))
+        elif isinstance(obj, User):
+            history = _history(obj, "favorites")
+            changes += [("favorite", f"{obj.id}:{place.id}", INSERT) for place in history.added]
+            changes += [("favorite", f"{obj.id}:{place.id}", DELETE) for place in history.deleted]
+    for obj in session.deleted:
+        entity = TRACKED.get(type(obj))
+        if entity:
+            changes.append((entity, inspect(obj).identity[0], DELETE))
+    return changes
+
+
+@event.listens_for(db.session, "after_flush")
+def _after_flush(session, flush_context):
+    _stage(session, _collect(session))
+
+
+@event.listens_for(db.session, "after_commit")
+def _after_commit(session):
+    pending = session.info.pop("change_feed_pending", None)
+    if not pending:
+        return
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    for _, change in pending:
+        for callback, entities in subscribers:
+            if entities is not None and change.entity not in entities:
+                continue
+            try:
+                callback(change)
+            except Exception:
+                current_app.logger.exception("Change feed subscriber %r failed", callback)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _after_rollback(session, previous_transaction):
+    pending = session.info.get("change_feed_pending")
+    if pending:
+        pending[:] = [(transaction, change) for transaction, change in pending
+                      if not _inside(transaction, previous_transaction)]
+
+
+def _inside(transaction, ancestor):
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+def _events(rows):
+    return [ChangeEvent(row.entity, row.entity_id, row.op, row.id) for row in rows]
+
+
+def consume(name, handler, batch_size=500, now=None):
+    """Pass unseen outbox events to ``handler(events)`` in batches and advance the cursor.
+
+    The cursor only moves after handler returns, so a crash means the batch
+    is delivered again: handlers should be idempotent. Events that committed
+    late (see GAP_TIMEOUT) arrive after higher ids, so don't rely on order.
+    Returns the number of events handled.
+    """
+    now = time.time() if now is None else now
+    cursor = db.session.get(ChangeCursor, name) or ChangeCursor(name=name, last_id=0)
+    stored_gaps = cursor.gaps or {}
+    gaps = {int(gap_id): seen for gap_id, seen in stored_gaps.items() if now - seen < GAP_TIMEOUT}
+    handled = 0
+
+    if gaps:
+        late = db.session.execute(
+            select(ChangeOutbox).where(ChangeOutbox.id.in_(gaps)).order_by(ChangeOutbox.id)
+        ).scalars().all()
+        if late:
+            handler(_events(late))
+            handled += len(late)
+        for row in late:
+            del gaps[row.id]
+    if len(gaps) != len(stored_gaps):
+        _save_cursor(cursor, gaps)
+
+    while True:
+        rows = db.session.execute(
+            select(ChangeOutbox).where(ChangeOutbox.id > cursor.last_id)
+            .order_by(ChangeOutbox.id).limit(batch_size)
+        ).scalars().all()
+        if not rows:
+            break
+        handler(_events(rows))
+        # a new cursor starts at the oldest row still in the outbox
+        expected = cursor.last_id + 1 if cursor.last_id else rows[0].id
+        for row in rows:
+            gaps.update((missing, now) for missing in range(expected, row.id))
+            expected = row.id + 1
+        cursor.last_id = rows[-1].id
+        _save_cursor(cursor, gaps)
+        handled += len(rows)
+    return handled
+
+
+def _save_cursor(cursor, gaps):
+    cursor.gaps = {str(gap_id): seen for gap_id, seen in gaps.items()}
+    db.session.merge(cursor)
+    db.session.commit()
+
+
+@click.command("prune-changes")
+@click.option("--days", default=7, show_default=True, help="Keep this many days of changes.")
+@with_appcontext
+def prune_changes_command(days):
+    """Delete old change feed rows that every consumer has seen."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    oldest_cursor = db.session.scalar(select(db.func.min(ChangeCursor.last_id)))
+    statement = delete(ChangeOutbox).where(ChangeOutbox.created_at < cutoff)
+    if oldest_cursor is not None:
+        statement = statement.where(ChangeOutbox.id <= oldest_cursor)
+    result = db.session.execute(statement)
+    db.session.commit()
+    click.echo(f"Deleted {result.rowcount} change(s).")
+
+
+def init_app(app):
+    app.cli.add_command(prune_changes_command)
@@ -0,0 +1,96 @@
+"""gzip / brotli response compression.
+
+Brotli is used when the optional ``brotli`` package is installed and the
+client accepts it, gzip otherwise. init_app() compresses dynamic text
+responses (HTML, JSON, ...) on the fly; static files are precompressed by
+assets.py instead.
+
+HTML that embeds a CSRF token or belongs to a session is sent uncompressed:
+those pages also reflect request input (search terms, pagination links), and
+compressing secrets next to attacker-chosen text leaks them through the
+response size (BREACH).
+
+Config:
+    COMPRESS_ENABLED    compress dynamic responses (default True); turn it
+                        off when a proxy in front already does it
+    COMPRESS_MIN_SIZE   smaller bodies are sent as they are (default 1024)
+"""
+import gzip
+
+from flask import current_app, request, session, g
+
+try:
+    import brotli  # optional dependency
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def best_encoding(request):
+    """Pick the best encoding both sides support, or None."""
+    accepted = request.accept_encodings
+    for encoding in available_encodings():
+        if accepted[encoding]:
+            return encoding
+    return None
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    return data
+
+
+COMPRESSIBLE_MIMETYPES = {"text/html", "text/plain", "text/css", "text/javascript",
+                          "application/javascript", "application/json", "application/x-ndjson",
+                          "image/svg+xml"}
+
+
+def _may_carry_secrets(response):
+    if response.mimetype != "text/html":
+        return False
+    # flask-wtf keeps the token of this request on g once a form rendered it
+    return (current_app.config.get("WTF_CSRF_FIELD_NAME", "csrf_token") in g
+            or bool(session) or "Set-Cookie" in response.headers)
+
+
+def compress_response(response):
+    """after_request hook: compress text responses above COMPRESS_MIN_SIZE."""
+    app = current_app
+    if (not app.config["COMPRESS_ENABLED"]
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add("Accept-Encoding")
+    if _may_carry_secrets(response):
+        return response
+    data = response.get_data()
+    if len(data) < app.config["COMPRESS_MIN_SIZE"]:
+        return response
+    encoding = best_encoding(request)
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    # a different byte representation of the same resource
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    app.config.setdefault("COMPRESS_ENABLED", True)
+    app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+    app.after_request(compress_response)
@@ -0,0 +1,46 @@
+"""Configuration profiles for create_app().
+
+Pick one with the GREENSPOTS_CONFIG environment variable ("development",
+"testing" or "production") or pass the name / class to create_app().
+Settings owned by one module (rate limits, caches, storage, ...) keep
+their defaults in that module's init_app(); only what differs per
+environment lives here.
+"""
+import os
+
+
+class Config:
+    SECRET_KEY = os.environ.get("SECRET_KEY")
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL") or "sqlite:///database.db"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    WTF_CSRF_ENABLED = True
+    # reverse proxies in front of the app whose X-Forwarded-For/-Proto to trust
+    TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", 0))
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    SECRET_KEY = os.environ.get("SECRET_KEY", "super-secret-key")
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SECRET_KEY = "testing"
+    SQLALCHEMY_DATABASE_URI = os.environ.get("TEST_DATABASE_URL", "sqlite://")
+    WTF_CSRF_ENABLED = False
+    RATELIMIT_ENABLED = False
+    # never hit the network from tests
+    CONTENT_TRANSLATION = False
+
+
+class ProductionConfig(Config):
+    # SECRET_KEY must come from the environment; create_app() refuses to start without it
+    DEBUG = False
+    TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", 1))
+
+
+CONFIGS = {
+    "development": DevelopmentConfig,
+    "testing": TestingConfig,
+    "production": ProductionConfig,
+}
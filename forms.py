@@ -37,6 +37,10 @@ class RegistrationForm(FlaskForm):
 
     def validate_username(self, username):
         from models import User # Local import to avoid circular imports if necessary
+        from account_deletion import DELETED_USERNAME_PREFIX
+        # reserved for scrubbed accounts ("deleted-<id>")
+        if username.data.lower().startswith(DELETED_USERNAME_PREFIX):
+            raise ValidationError('ეს მომხმარებლის სახელი დაუშვებელია.')
         user = User.query.filter_by(username=username.data).first()
         if user:
             raise ValidationError('ეს მომხმარებლის სახელი უკვე დაკავებულია.')
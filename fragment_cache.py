@@ -0,0 +1,164 @@
+"""Jinja fragment caching and template bytecode cache.
+
+Templates cache expensive pieces with::
+
+    {% cache ("place-card", place.id, place.created_at, place.revision, place.local_name), 300 %}
+        ... card markup ...
+    {% endcache %}
+
+The key is any tuple of values; the current language (g.lang) is always
+added, so English and Georgian renders never mix. Keys name everything the
+markup shows: ids alone are reused by SQLite after a delete (hence
+created_at), and a translation stored after the first render changes
+local_name but not the revision. The TTL is optional and
+defaults to FRAGMENT_CACHE_TTL seconds.
+
+Config:
+    FRAGMENT_CACHE_BACKEND    "memory" (default, per-process LRU), "null" to
+                              disable, or "redis://host:6379/1" to share
+                              fragments between workers
+    FRAGMENT_CACHE_SIZE       max entries in the memory LRU
+    FRAGMENT_CACHE_TTL        default TTL in seconds
+    TEMPLATE_BYTECODE_CACHE   directory for compiled templates, so a new
+                              worker doesn't re-parse every template
+                              (default <instance>/jinja_cache, None disables)
+
+``flask precompile-templates`` fills the bytecode cache at deploy time.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import click
+from flask import g, has_request_context
+from flask.cli import with_appcontext
+from jinja2 import nodes, FileSystemBytecodeCache
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+class MemoryBackend:
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class NullBackend:
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def clear(self):
+        pass
+
+
+class RedisBackend:
+    def __init__(self, url):
+        import redis  # optional dependency, only needed for this backend
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.client.get("fragment:" + key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set("fragment:" + key, value.encode("utf-8"), ex=int(ttl))
+
+    def clear(self):
+        for key in self.client.scan_iter("fragment:*"):
+            self.client.delete(key)
+
+
+def create_backend(url, maxsize):
+    if not url or url == "memory":
+        return MemoryBackend(maxsize)
+    if url == "null":
+        return NullBackend()
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unknown FRAGMENT_CACHE_BACKEND: {url}")
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=MemoryBackend(), fragment_cache_ttl=300)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = parser.parse_expression()
+        ttl = parser.parse_expression() if parser.stream.skip_if("comma") else nodes.Const(None)
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(self.call_method("_cache", [key, ttl]), [], [], body).set_lineno(lineno)
+
+    def _cache(self, key, ttl, caller):
+        lang = g.get("lang") if has_request_context() else None
+        cache_key = hashlib.sha1(repr((key, lang)).encode("utf-8")).hexdigest()
+        backend = self.environment.fragment_cache
+
+        value = backend.get(cache_key)
+        if value is None:
+            value = str(caller())
+            backend.set(cache_key, value, ttl or self.environment.fragment_cache_ttl)
+        return Markup(value)
+
+
+def init_app(app):
+    app.config.setdefault("FRAGMENT_CACHE_BACKEND", "memory")
+    app.config.setdefault("FRAGMENT_CACHE_SIZE", 2048)
+    app.config.setdefault("FRAGMENT_CACHE_TTL", 300)
+    app.config.setdefault("TEMPLATE_BYTECODE_CACHE", os.path.join(app.instance_path, "jinja_cache"))
+
+    env = app.jinja_env
+    env.add_extension(FragmentCacheExtension)
+    env.fragment_cache = create_backend(app.config["FRAGMENT_CACHE_BACKEND"], app.config["FRAGMENT_CACHE_SIZE"])
+    env.fragment_cache_ttl = app.config["FRAGMENT_CACHE_TTL"]
+
+    bytecode_dir = app.config["TEMPLATE_BYTECODE_CACHE"]
+    if bytecode_dir:
+        os.makedirs(bytecode_dir, exist_ok=True)
+        env.bytecode_cache = FileSystemBytecodeCache(bytecode_dir)
+
+    app.cli.add_command(precompile_templates_command)
+
+
+@click.command("precompile-templates")
+@with_appcontext
+def precompile_templates_command():
+    """Compile every template into the bytecode cache."""
+    from flask import current_app
+
+    env = current_app.jinja_env
+    names = env.list_templates(filter_func=lambda name: name.endswith(".html"))
+    for name in names:
+        env.get_template(name)
+    click.echo(f"Compiled {len(names)} template(s).")
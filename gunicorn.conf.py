@@ -0,0 +1,55 @@
+"""Gunicorn settings: load the app once in the master, then fork workers.
+
+With preload_app the imports and create_app() run a single time and the
+workers share those memory pages copy-on-write, so a new worker starts in
+milliseconds and only pays for what it allocates itself. The garbage
+collector would otherwise touch (and so copy) every preloaded object in
+each worker; gc.freeze() moves them out of its reach first.
+
+Every worker keeps its own request metrics; they are merged for /metrics
+through GREENSPOTS_METRICS_DIR (see instrumentation.py), which defaults to a
+directory per master process and is emptied on startup.
+
+    SECRET_KEY=... gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import gc
+import glob
+import multiprocessing
+import os
+import tempfile
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:" + os.environ.get("PORT", "8000"))
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+preload_app = True
+
+# set before the app is loaded so create_app() picks it up
+metrics_dir = os.environ.setdefault(
+    "GREENSPOTS_METRICS_DIR", os.path.join(tempfile.gettempdir(), f"greenspots-metrics-{os.getpid()}"))
+
+
+def on_starting(server):
+    # counters start from zero with a new master
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, "*.json")):
+        os.remove(path)
+
+
+def when_ready(server):
+    # runs in the master after the app is loaded, before any worker is forked
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # pooled connections must not be shared across processes
+    from models import db
+    with worker.app.wsgi().app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    # the last requests of a worker still count once it is gone
+    import instrumentation
+    app = worker.app.wsgi()
+    if app.config["INSTRUMENTATION_ENABLED"] and app.config["METRICS_DIR"]:
+        instrumentation.publish(app.config["METRICS_DIR"], force=True)
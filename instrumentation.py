@@ -0,0 +1,308 @@
+"""Opt-in per-request instrumentation.
+
+Enabled with INSTRUMENTATION_ENABLED (or GREENSPOTS_INSTRUMENTATION=1). For
+every request it records wall time, SQL query count and time and template
+render time, and then:
+
+* adds a Server-Timing header (visible in the browser dev tools),
+* logs one structured JSON line on the "greenspots.metrics" logger,
+* feeds per-endpoint histograms served at /metrics in Prometheus format,
+* dumps a cProfile file for sampled requests slower than PROFILE_SLOW_REQUEST_MS.
+
+Work wrapped in ``timed(kind)``, such as translator calls from background
+threads, is recorded in a per-kind histogram whether or not a request is
+running.
+
+Each process keeps its own histograms. With several workers set METRICS_DIR
+(gunicorn.conf.py does): every worker writes a snapshot of its counters to
+a file there at most once a second, and /metrics adds up all files, those
+of exited workers included, so the totals never go backwards.
+
+/metrics requires ``Authorization: Bearer <METRICS_TOKEN>``; without a
+token it is only served in debug mode.
+"""
+import cProfile
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from flask import g, request, has_request_context, template_rendered, before_render_template, abort
+from sqlalchemy import event
+
+logger = logging.getLogger("greenspots.metrics")
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+DEFAULTS = {
+    "INSTRUMENTATION_ENABLED": os.environ.get("GREENSPOTS_INSTRUMENTATION") == "1",
+    "METRICS_TOKEN": os.environ.get("GREENSPOTS_METRICS_TOKEN"),
+    "METRICS_DIR": os.environ.get("GREENSPOTS_METRICS_DIR"),
+    "PROFILE_SAMPLE_RATE": 0.05,
+    "PROFILE_SLOW_REQUEST_MS": 500,
+    "PROFILE_DIR": None,  # defaults to <instance>/profiles
+}
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, label_name="endpoint"):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label_name = label_name
+        self.series = {}
+
+    def observe(self, label, value):
+        counts, total = self.series.get(label, ([0] * (len(self.buckets) + 1), 0.0))
+        counts[bisect_left(self.buckets, value)] += 1
+        self.series[label] = (counts, total + value)
+
+    def render(self, series):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            labels = f'{self.label_name}="{label}"'
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.request_duration = Histogram(
+            "greenspots_request_duration_seconds", "Request wall time.", DURATION_BUCKETS)
+        self.sql_duration = Histogram(
+            "greenspots_sql_duration_seconds", "SQL time per request.", DURATION_BUCKETS)
+        self.sql_queries = Histogram(
+            "greenspots_sql_queries", "SQL queries per request.", QUERY_BUCKETS)
+        self.render_duration = Histogram(
+            "greenspots_render_duration_seconds", "Template render time per request.", DURATION_BUCKETS)
+        self.task_duration = Histogram(
+            "greenspots_task_duration_seconds", "Duration of timed() blocks.", DURATION_BUCKETS,
+            label_name="kind")
+        self.histograms = (self.request_duration, self.sql_duration, self.sql_queries,
+                           self.render_duration, self.task_duration)
+
+    def observe(self, endpoint, timings):
+        with self.lock:
+            self.request_duration.observe(endpoint, timings["total"])
+            self.sql_duration.observe(endpoint, timings["sql"])
+            self.sql_queries.observe(endpoint, timings["sql_count"])
+            self.render_duration.observe(endpoint, timings["render"])
+
+    def observe_task(self, kind, elapsed):
+        with self.lock:
+            self.task_duration.observe(kind, elapsed)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "histograms": {histogram.name: {label: [list(counts), total]
+                                                for label, (counts, total) in histogram.series.items()}
+                               for histogram in self.histograms},
+            }
+
+    def render(self, snapshots):
+        """Prometheus text for the sum of the given snapshots."""
+        lines = []
+        for histogram in self.histograms:
+            series = {}
+            for snapshot in snapshots:
+                for label, (counts, total) in snapshot["histograms"].get(histogram.name, {}).items():
+                    merged_counts, merged_total = series.get(label, ([0] * len(counts), 0.0))
+                    series[label] = ([a + b for a, b in zip(merged_counts, counts)], merged_total + total)
+            lines.extend(histogram.render(series))
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+PUBLISH_INTERVAL = 1.0
+
+# (pid, snapshot file) of this process; workers forked from a preloaded
+# master get their own file, even when the OS reuses a pid
+_snapshot_file = (None, None)
+_published_at = 0.0
+
+
+def publish(directory, force=False):
+    """Write this process's counters to its snapshot file in directory."""
+    global _snapshot_file, _published_at
+    now = time.monotonic()
+    if not force and now - _published_at < PUBLISH_INTERVAL:
+        return
+    _published_at = now
+    pid, path = _snapshot_file
+    if pid != os.getpid():
+        pid = os.getpid()
+        path = os.path.join(directory, f"{pid}-{uuid.uuid4().hex[:8]}.json")
+        _snapshot_file = (pid, path)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as out:
+        json.dump(metrics.snapshot(), out)
+    os.replace(tmp, path)
+
+
+def collect(directory):
+    """Snapshots of every process that published to directory."""
+    snapshots = []
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(directory, name)) as snapshot:
+                    snapshots.append(json.load(snapshot))
+            except (OSError, ValueError):
+                continue
+    return snapshots
+
+
+def _stats():
+    if has_request_context():
+        return g.get("_instrumentation")
+    return None
+
+
+def record(kind, elapsed):
+    """Add one timed call (``sql`` or ``render``) to the current request."""
+    stats = _stats()
+    if stats is not None:
+        stats[kind] += elapsed
+        stats[kind + "_count"] += 1
+
+
+class timed:
+    """``with timed("translate"): ...`` records the block in the task histogram."""
+
+    def __init__(self, kind):
+        self.kind = kind
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        metrics.observe_task(self.kind, time.perf_counter() - self.start)
+        return False
+
+
+def init_app(app, db):
+    for key, value in DEFAULTS.items():
+        app.config.setdefault(key, value)
+    if not app.config["INSTRUMENTATION_ENABLED"]:
+        return
+
+    if not logger.handlers:
+        logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+    profile_dir = app.config["PROFILE_DIR"] or os.path.join(app.instance_path, "profiles")
+    metrics_dir = app.config["METRICS_DIR"]
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record("sql", time.perf_counter() - conn.info["_query_start"].pop())
+
+    def _before_render(sender, template, context, **extra):
+        stats = _stats()
+        if stats is not None:
+            stats["_render_start"].append(time.perf_counter())
+
+    def _rendered(sender, template, context, **extra):
+        stats = _stats()
+        if stats is not None and stats["_render_start"]:
+            record("render", time.perf_counter() - stats["_render_start"].pop())
+
+    before_render_template.connect(_before_render, app, weak=False)
+    template_rendered.connect(_rendered, app, weak=False)
+
+    @app.before_request
+    def _start_request():
+        g._instrumentation = {
+            "start": time.perf_counter(), "_render_start": [],
+            "sql": 0.0, "sql_count": 0, "render": 0.0, "render_count": 0,
+        }
+        g._profiler = None
+        if random.random() < app.config["PROFILE_SAMPLE_RATE"]:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                g._profiler = profiler
+            except ValueError:
+                # another thread is already profiling
+                pass
+
+    @app.after_request
+    def _finish_request(response):
+        stats = g.pop("_instrumentation", None)
+        if stats is None:
+            return response
+        profiler = g.pop("_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+
+        endpoint = request.endpoint or "unknown"
+        timings = {
+            "total": time.perf_counter() - stats["start"],
+            "sql": stats["sql"], "sql_count": stats["sql_count"],
+            "render": stats["render"],
+        }
+        if endpoint != "metrics":
+            metrics.observe(endpoint, timings)
+            if metrics_dir:
+                publish(metrics_dir)
+
+        response.headers.add("Server-Timing", ", ".join([
+            f'app;dur={timings["total"] * 1000:.1f}',
+            f'sql;dur={timings["sql"] * 1000:.1f};desc="{timings["sql_count"]} queries"',
+            f'render;dur={timings["render"] * 1000:.1f}',
+        ]))
+
+        logger.info(json.dumps({
+            "endpoint": endpoint, "method": request.method, "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(timings["total"] * 1000, 2),
+            "sql_queries": timings["sql_count"], "sql_ms": round(timings["sql"] * 1000, 2),
+            "render_ms": round(timings["render"] * 1000, 2),
+        }))
+
+        if profiler is not None and timings["total"] * 1000 >= app.config["PROFILE_SLOW_REQUEST_MS"]:
+            os.makedirs(profile_dir, exist_ok=True)
+            filename = f"{endpoint}-{int(time.time() * 1000)}.prof"
+            profiler.dump_stats(os.path.join(profile_dir, filename))
+            logger.warning("Slow request %s %s profiled to %s", request.method, request.path, filename)
+
+        return response
+
+    @app.route("/metrics", endpoint="metrics")
+    def metrics_endpoint():
+        token = app.config["METRICS_TOKEN"]
+        if not token and not app.debug:
+            abort(404)
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            abort(403)
+        if metrics_dir:
+            publish(metrics_dir, force=True)
+            snapshots = collect(metrics_dir)
+        else:
+            snapshots = [metrics.snapshot()]
+        return metrics.render(snapshots), 200, {"Content-Type": "text/plain; version=0.0.4"}
@@ -0,0 +1,91 @@
+"""Compact map points for /map.
+
+The map page is a static shell; static/js/map.js fetches the places with
+coordinates from /map/points as (id, lat, lon, category code) tuples, either
+
+* ``format=bin`` (default): packed little-endian records of
+  uint32 id, float32 lat, float32 lon, uint8 category, 13 bytes each, or
+* ``format=ndjson``: one ``[id, lat, lon, category]`` JSON array per line.
+
+The category code is the index into forms.CATEGORY_CHOICES (255 = unknown).
+The body is versioned with an ETag made from the place write counter of
+the change feed (change_feed.version), so a repeat visit costs one primary
+key lookup and a 304. Encoded and compressed bodies of the current version
+are kept in memory.
+"""
+import json
+import struct
+import threading
+
+from sqlalchemy import select
+
+import change_feed
+import compression
+from forms import CATEGORY_CHOICES
+from models import db, Place
+
+RECORD = struct.Struct("<IffB")
+UNKNOWN_CATEGORY = 255
+CATEGORY_CODES = {code: index for index, (code, _) in enumerate(CATEGORY_CHOICES)}
+
+FORMATS = {
+    "bin": "application/octet-stream",
+    "ndjson": "application/x-ndjson",
+}
+
+_located = (Place.latitude.isnot(None), Place.longitude.isnot(None))
+
+_bodies = {}
+_bodies_version = None
+_bodies_lock = threading.Lock()
+
+
+def points_version():
+    return str(change_feed.version("place"))
+
+
+def _points():
+    return db.session.execute(
+        select(Place.id, Place.latitude, Place.longitude, Place.category)
+        .where(*_located).order_by(Place.id)
+    )
+
+
+def encode_binary(rows):
+    return b"".join(RECORD.pack(id, lat, lon, CATEGORY_CODES.get(category, UNKNOWN_CATEGORY))
+                    for id, lat, lon, category in rows)
+
+
+def encode_ndjson(rows):
+    return "".join(
+        json.dumps([id, round(lat, 6), round(lon, 6), CATEGORY_CODES.get(category, UNKNOWN_CATEGORY)],
+                   separators=(",", ":")) + "\n"
+        for id, lat, lon, category in rows
+    ).encode("utf-8")
+
+
+ENCODERS = {"bin": encode_binary, "ndjson": encode_ndjson}
+
+
+def points_body(version, fmt, encoding):
+    """The encoded (and compressed) points for this version, built once."""
+    global _bodies_version
+    key = (fmt, encoding)
+    with _bodies_lock:
+        if _bodies_version == version and key in _bodies:
+            return _bodies[key]
+
+    raw_key = (fmt, None)
+    with _bodies_lock:
+        raw = _bodies.get(raw_key) if _bodies_version == version else None
+    if raw is None:
+        raw = ENCODERS[fmt](_points())
+    body = compression.compress(raw, encoding) if encoding else raw
+
+    with _bodies_lock:
+        if _bodies_version != version:
+            _bodies.clear()
+            _bodies_version = version
+        _bodies[raw_key] = raw
+        _bodies[key] = body
+    return body
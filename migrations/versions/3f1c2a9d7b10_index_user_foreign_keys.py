@@ -0,0 +1,38 @@
+"""index user foreign keys
+
+Revision ID: 3f1c2a9d7b10
+Revises: 6da355271e45
+Create Date: 2026-10-19 10:12:40.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d7b10'
+down_revision = '6da355271e45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('place', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_place_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('rating', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_rating_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('planned_route', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_planned_route_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('planned_route', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_planned_route_user_id'))
+
+    with op.batch_alter_table('rating', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_rating_user_id'))
+
+    with op.batch_alter_table('place', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_place_user_id'))
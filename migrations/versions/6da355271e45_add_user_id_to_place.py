@@ -1,7 +1,7 @@
 """add user_id to Place
 
 Revision ID: 6da355271e45
-Revises: 
+Revises: 0a7c3e5d9b12
 Create Date: 2026-01-15 21:36:53.595548
 
 """
@@ -11,7 +11,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision = '6da355271e45'
-down_revision = None
+down_revision = '0a7c3e5d9b12'
 branch_labels = None
 depends_on = None
 
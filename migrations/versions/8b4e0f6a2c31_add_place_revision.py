@@ -0,0 +1,26 @@
+"""add place revision
+
+Revision ID: 8b4e0f6a2c31
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-19 11:02:17.530614
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4e0f6a2c31'
+down_revision = '3f1c2a9d7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('place', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('place', schema=None) as batch_op:
+        batch_op.drop_column('revision')
@@ -0,0 +1,50 @@
+"""one rating per user and place, place rating aggregates
+
+Revision ID: c72d9e41a8f5
+Revises: 8b4e0f6a2c31
+Create Date: 2026-10-19 12:20:05.774912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c72d9e41a8f5'
+down_revision = '8b4e0f6a2c31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # keep only the latest rating of each user for a place
+    op.execute(
+        "DELETE FROM rating WHERE user_id IS NOT NULL AND id NOT IN "
+        "(SELECT MAX(id) FROM rating WHERE user_id IS NOT NULL GROUP BY user_id, place_id)"
+    )
+
+    with op.batch_alter_table('rating', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('submission_token', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_rating_place_id'), ['place_id'], unique=False)
+        batch_op.create_unique_constraint('uq_rating_user_place', ['user_id', 'place_id'])
+
+    with op.batch_alter_table('place', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_place_rating'), ['rating'], unique=False)
+
+    op.execute(
+        "UPDATE place SET "
+        "rating_count = (SELECT COUNT(*) FROM rating WHERE rating.place_id = place.id), "
+        "rating = (SELECT AVG(stars) FROM rating WHERE rating.place_id = place.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('place', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_place_rating'))
+        batch_op.drop_column('rating_count')
+
+    with op.batch_alter_table('rating', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_rating_user_place', type_='unique')
+        batch_op.drop_index(batch_op.f('ix_rating_place_id'))
+        batch_op.drop_column('submission_token')
@@ -0,0 +1,43 @@
+"""change feed outbox and consumer cursors
+
+Revision ID: d41b7e2f9c06
+Revises: c72d9e41a8f5
+Create Date: 2026-10-19 13:05:41.218304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41b7e2f9c06'
+down_revision = 'c72d9e41a8f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=30), nullable=False),
+    sa.Column('entity_id', sa.String(length=64), nullable=False),
+    sa.Column('op', sa.String(length=10), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('change_outbox', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_change_outbox_created_at'), ['created_at'], unique=False)
+
+    op.create_table('change_cursor',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('change_cursor')
+    with op.batch_alter_table('change_outbox', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_change_outbox_created_at'))
+
+    op.drop_table('change_outbox')
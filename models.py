@@ -2,13 +2,17 @@ from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import query_expression
 
 db = SQLAlchemy()
 
 favorites_table = db.Table(
     'favorites',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
-    db.Column('place_id', db.Integer, db.ForeignKey('place.id'), primary_key=True)
+    db.Column('place_id', db.Integer, db.ForeignKey('place.id'), primary_key=True),
+    # when it was favorited, for "newest favorites" lists
+    db.Column('created_at', db.DateTime, default=datetime.utcnow)
 )
 
 
@@ -26,6 +30,8 @@ class User(UserMixin, db.Model):
 
     role = db.Column(db.String(50), default="user")  # optional
     is_admin = db.Column(db.Boolean, default=False)
+    # bumped by user_cache.invalidate() so every worker drops its cached snapshot
+    cache_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -33,13 +39,6 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
-    def calculate_avg_rating(self):
-        if not self.favorites:
-            return 0
-        total = sum(place.rating for place in self.favorites if getattr(place, 'rating', 0))
-        count = sum(1 for place in self.favorites if getattr(place, 'rating', 0) is not None)
-        return round(total / count, 1) if count else 0
-
 class Route(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False)
@@ -57,26 +56,65 @@ class Place(db.Model):
     image = db.Column(db.String(200))
     latitude = db.Column(db.Float, nullable=True)
     longitude = db.Column(db.Float, nullable=True)
-    rating = db.Column(db.Float)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    # average stars and number of ratings, kept up to date by ratings.refresh_place_ratings
+    rating = db.Column(db.Float, index=True)
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
     user = db.relationship('User', backref='places')
 
     ratings = db.relationship('Rating', backref='place', lazy=True)
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'))
+    # bumped on every update, used in template fragment cache keys
+    revision = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # also in the cache keys: SQLite may hand a deleted place's id to a new one
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # name/description in the page language, loaded with translations.place_options()
+    local_name = query_expression()
+    local_description = query_expression()
+
+    @property
+    def avg_rating(self):
+        return round(self.rating or 0, 1)
+
+    @property
+    def display_name(self):
+        return self.local_name if self.local_name is not None else self.name
+
+    @property
+    def display_description(self):
+        return self.local_description if self.local_description is not None else self.description
 
     def __repr__(self):
         return f"<Place {self.name}>"
 
 
+@event.listens_for(Place, "before_update")
+def bump_place_revision(mapper, connection, place):
+    # before_update also fires when only a collection (e.g. favorited_by) changed
+    if db.session.object_session(place).is_modified(place, include_collections=False):
+        place.revision = (place.revision or 0) + 1
+
+
 class Rating(db.Model):
+    # one rating per user and place; resubmitting updates it
+    __table_args__ = (db.UniqueConstraint('user_id', 'place_id', name='uq_rating_user_place'),)
+
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
-    place_id = db.Column(db.Integer, db.ForeignKey('place.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+    place_id = db.Column(db.Integer, db.ForeignKey('place.id'), index=True)
     stars = db.Column(db.Float, nullable=False)  # 0–5 scale
     comment = db.Column(db.Text)
     image = db.Column(db.String(200))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # idempotency keys of the latest form submissions that wrote this rating, oldest first
+    submission_tokens = db.Column(db.JSON)
     user = db.relationship('User', backref='ratings')
+    # comment in the page language, loaded with translations.rating_options()
+    local_comment = query_expression()
+
+    @property
+    def display_comment(self):
+        return self.local_comment if self.local_comment is not None else self.comment
 
 class Favorite(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -106,9 +144,91 @@ class Category(db.Model):
 
 class PlannedRoute(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
     place_id = db.Column(db.Integer, db.ForeignKey('place.id'))
     date = db.Column(db.Date, nullable=False)
 
     user = db.relationship('User', backref='routes')
     place = db.relationship('Place', backref='planned_routes')
+
+
+class ChangeOutbox(db.Model):
+    """Durable change feed: one row per catalogue write, see change_feed.py."""
+    __tablename__ = 'change_outbox'
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(30), nullable=False)
+    entity_id = db.Column(db.String(64), nullable=False)
+    op = db.Column(db.String(10), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+class ChangeCursor(db.Model):
+    """Last outbox id each feed consumer has handled."""
+    __tablename__ = 'change_cursor'
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    # {"id": first seen (epoch seconds)} for ids below last_id not committed yet
+    gaps = db.Column(db.JSON)
+
+class EntityVersion(db.Model):
+    """Write counter of an entity, bumped in the writing transaction (see change_feed.py)."""
+    __tablename__ = 'entity_version'
+    entity = db.Column(db.String(30), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
+class PlaceTranslation(db.Model):
+    """Place name/description in another language, filled when the place is written."""
+    __tablename__ = 'place_translation'
+    place_id = db.Column(db.Integer, db.ForeignKey('place.id', ondelete='CASCADE'), primary_key=True)
+    lang = db.Column(db.String(5), primary_key=True)
+    name = db.Column(db.String(200), nullable=False, index=True)
+    description = db.Column(db.Text)
+
+class RatingTranslation(db.Model):
+    """Rating comment in another language."""
+    __tablename__ = 'rating_translation'
+    rating_id = db.Column(db.Integer, db.ForeignKey('rating.id', ondelete='CASCADE'), primary_key=True)
+    lang = db.Column(db.String(5), primary_key=True)
+    comment = db.Column(db.Text)
+
+
+class UserStats(db.Model):
+    """Per-user counters, kept up to date by user_stats.py."""
+    __tablename__ = 'user_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    places_added = db.Column(db.Integer, nullable=False, default=0)
+    ratings_given = db.Column(db.Integer, nullable=False, default=0)
+    # sum of the stars of ratings_given ratings
+    stars_given = db.Column(db.Float, nullable=False, default=0)
+    favorites = db.Column(db.Integer, nullable=False, default=0)
+    planned_routes = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def avg_stars_given(self):
+        return round(self.stars_given / self.ratings_given, 1) if self.ratings_given else 0
+
+class BulkJob(db.Model):
+    """Progress of an admin bulk operation, readable by every worker (see bulk_ops.py)."""
+    __tablename__ = 'bulk_job'
+    id = db.Column(db.String(32), primary_key=True)
+    action = db.Column(db.String(20), nullable=False)
+    value = db.Column(db.String(100))
+    filters = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default="running")
+    done = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # heartbeat of the thread running the job, written after every batch
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class Activity(db.Model):
+    """Append-only feed of what users did, paged by id (newest first)."""
+    __tablename__ = 'activity'
+    __table_args__ = (db.Index('ix_activity_user_id_id', 'user_id', 'id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    # no FK: the feed outlives deleted places
+    place_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,206 @@
+"""Token bucket rate limiting.
+
+Views opt in with a decorator::
+
+    @app.route("/login", methods=["GET", "POST"])
+    @limiter.limit("10/minute", methods=["POST"])
+    def login(): ...
+
+Buckets are keyed by the logged-in user id, or the client IP for anonymous
+requests, plus the endpoint. Behind a reverse proxy set TRUSTED_PROXIES so
+the client IP is taken from X-Forwarded-For instead of the proxy's address. When a bucket is empty the view is not called
+and a 429 with Retry-After is returned instead.
+
+Config:
+    RATELIMIT_ENABLED    turn limiting on/off (default True)
+    RATELIMIT_STORAGE    "memory" (default, per process),
+                         "sqlite:////path/to/file.db" or "redis://host:6379/0"
+                         to share buckets between workers
+    RATELIMIT_OVERRIDES  {"endpoint": "5/minute"} to change a limit per endpoint
+"""
+import math
+import sqlite3
+import threading
+import time
+from functools import wraps
+from zlib import crc32
+
+from flask import current_app, request, jsonify
+from flask_login import current_user
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_limit(spec):
+    """ "10/minute" -> (capacity, refill per second) """
+    count, _, period = spec.partition("/")
+    count = int(count)
+    return count, count / PERIODS[period.strip().rstrip("s")]
+
+
+def _refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class MemoryStore:
+    """Process-local buckets, sharded so concurrent threads rarely share a lock."""
+
+    def __init__(self, shards=16, idle_ttl=3600):
+        self.shards = [({}, threading.Lock()) for _ in range(shards)]
+        self.idle_ttl = idle_ttl
+        self.last_sweep = time.monotonic()
+
+    def consume(self, key, capacity, rate, now=None):
+        now = time.monotonic() if now is None else now
+        buckets, lock = self.shards[crc32(key.encode()) % len(self.shards)]
+        with lock:
+            tokens, updated = buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated, now, capacity, rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            buckets[key] = (tokens, now)
+        if now - self.last_sweep > self.idle_ttl:
+            self.sweep(now)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def sweep(self, now):
+        self.last_sweep = now
+        for buckets, lock in self.shards:
+            with lock:
+                for key in [k for k, (_, updated) in buckets.items() if now - updated > self.idle_ttl]:
+                    del buckets[key]
+
+
+class SQLiteStore:
+    """Buckets shared by every worker on the same host through one SQLite file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        # a throw-away connection: one opened here could end up shared by forked workers
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS rate_buckets "
+                             "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def consume(self, key, capacity, rate, now=None):
+        now = time.time() if now is None else now
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(*(row or (capacity, now)), now, capacity, rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute("INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                         (key, tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+
+class RedisStore:
+    """Buckets in Redis (or anything speaking its protocol), updated atomically with Lua."""
+
+    SCRIPT = """
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local capacity, rate, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url):
+        import redis  # optional dependency, only needed for this backend
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(self.SCRIPT)
+
+    def consume(self, key, capacity, rate, now=None):
+        now = time.time() if now is None else now
+        allowed, tokens = self.script(keys=["ratelimit:" + key], args=[capacity, rate, now])
+        tokens = float(tokens)
+        return bool(allowed), 0 if allowed else (1 - tokens) / rate
+
+
+def create_store(url):
+    if not url or url == "memory":
+        return MemoryStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://")):
+        return RedisStore(url)
+    raise ValueError(f"Unknown RATELIMIT_STORAGE: {url}")
+
+
+def client_key():
+    if current_user.is_authenticated:
+        return f"user:{current_user.get_id()}"
+    return f"ip:{request.remote_addr}"
+
+
+class RateLimiter:
+    def __init__(self, app=None):
+        self.store = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RATELIMIT_ENABLED", True)
+        app.config.setdefault("RATELIMIT_STORAGE", "memory")
+        app.config.setdefault("RATELIMIT_OVERRIDES", {})
+        self.store = create_store(app.config["RATELIMIT_STORAGE"])
+        app.extensions["ratelimit"] = self
+
+    def limit(self, spec, methods=None, key=client_key, json=False):
+        def decorator(view):
+            @wraps(view)
+            def wrapped(*args, **kwargs):
+                config = current_app.config
+                if not config["RATELIMIT_ENABLED"] or (methods and request.method not in methods):
+                    return view(*args, **kwargs)
+
+                capacity, rate = parse_limit(config["RATELIMIT_OVERRIDES"].get(request.endpoint, spec))
+                allowed, retry_after = self.store.consume(f"{request.endpoint}:{key()}", capacity, rate)
+                if not allowed:
+                    return too_many_requests(retry_after, json)
+                return view(*args, **kwargs)
+            return wrapped
+        return decorator
+
+
+def too_many_requests(retry_after, json=False):
+    retry_after = max(1, math.ceil(retry_after))
+    if json or request.is_json:
+        response = jsonify({"status": "error", "message": "Too many requests"})
+    else:
+        response = current_app.response_class("Too many requests, please try again later.",
+                                              mimetype="text/plain")
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+limiter = RateLimiter()
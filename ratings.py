@@ -0,0 +1,101 @@
+"""Rating submission.
+
+Every user has at most one rating per place (unique index on user_id,
+place_id): submitting again updates it instead of adding a duplicate. The
+form carries an idempotency key, so a double click or a refreshed POST that
+already went through is recognised and ignored before anything (including
+the image upload) is written. The last RECENT_TOKENS keys are kept, so a
+retried request that arrives after a newer submission is ignored too
+instead of overwriting it.
+
+Place.rating / Place.rating_count hold the average and count, recomputed
+with one UPDATE in the same transaction as the write that changed them, so
+pages read the average from the place row instead of loading every rating.
+"""
+import math
+from datetime import datetime
+
+from sqlalchemy import select, update, func
+from sqlalchemy.exc import IntegrityError
+
+import change_feed
+from models import db, Place, Rating
+
+MIN_STARS = 0
+MAX_STARS = 5
+RECENT_TOKENS = 10
+
+
+def parse_stars(value):
+    try:
+        stars = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid rating")
+    if math.isnan(stars) or not MIN_STARS <= stars <= MAX_STARS:
+        raise ValueError("Invalid rating")
+    return stars
+
+
+def is_duplicate_submission(user_id, place_id, token):
+    if not token:
+        return False
+    tokens = db.session.scalar(
+        select(Rating.submission_tokens).where(Rating.user_id == user_id, Rating.place_id == place_id))
+    return token in (tokens or ())
+
+
+def _rating_of(user_id, place_id):
+    return Rating.query.filter_by(user_id=user_id, place_id=place_id).first()
+
+
+def refresh_place_ratings(place_ids=None):
+    """Recompute Place.rating / rating_count for the given places (or all).
+
+    Changes to the listed places are reported to the change feed; a full
+    recompute is a maintenance job and is not.
+    """
+    count = select(func.count(Rating.id)).where(Rating.place_id == Place.id).scalar_subquery()
+    average = select(func.avg(Rating.stars)).where(Rating.place_id == Place.id).scalar_subquery()
+    statement = update(Place).values(rating_count=count, rating=average)
+    if place_ids is not None:
+        place_ids = list(set(place_ids))
+        if not place_ids:
+            return
+        statement = statement.where(Place.id.in_(place_ids))
+    db.session.execute(statement.execution_options(synchronize_session=False))
+    if place_ids is not None:
+        change_feed.record_changes("place", place_ids, change_feed.UPDATE)
+
+
+def submit_rating(user_id, place_id, stars, comment, image=None, token=None):
+    """Create or update the user's rating of a place.
+
+    Returns the name of an image the new one replaced, so the caller can
+    remove it once the transaction is committed.
+    """
+    values = {"stars": stars, "comment": comment, "timestamp": datetime.utcnow()}
+    if image:
+        values["image"] = image
+
+    rating = _rating_of(user_id, place_id)
+    if rating is None:
+        try:
+            with db.session.begin_nested():
+                db.session.add(Rating(user_id=user_id, place_id=place_id,
+                                      submission_tokens=[token] if token else [], **values))
+        except IntegrityError:
+            # a concurrent request inserted it first; update that one
+            rating = _rating_of(user_id, place_id)
+
+    replaced_image = None
+    if rating is not None:
+        if image and rating.image and rating.image != image:
+            replaced_image = rating.image
+        for key, value in values.items():
+            setattr(rating, key, value)
+        if token:
+            rating.submission_tokens = ((rating.submission_tokens or []) + [token])[-RECENT_TOKENS:]
+
+    db.session.flush()
+    refresh_place_ratings([place_id])
+    return replaced_image
@@ -1,6 +1,5 @@
-from app import app, db
+from app import create_app
 
 if __name__ == "__main__":
-    with app.app_context():
-        db.create_all()
-    app.run(host="0.0.0.0", debug=True)
+    # the schema is managed by migrations: run ``flask --app app db upgrade`` first
+    create_app().run(host="0.0.0.0", debug=True)
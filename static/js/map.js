@@ -0,0 +1,108 @@
+// Interactive map: markers are loaded from /map/points as packed binary records
+// (uint32 id, float32 lat, float32 lon, uint8 category; little-endian, 13 bytes each)
+(function () {
+    const RECORD_SIZE = 13;
+    const BATCH = 2000;
+
+    const el = document.getElementById('map');
+    const lang = el.dataset.lang;
+    const categories = JSON.parse(el.dataset.categories);
+    const viewText = lang === 'en' ? "View" : "ნახვა";
+    const noPlacesText = lang === 'en' ? "No places added yet" : "ჯერ ადგილი არ არის დამატებული";
+
+    // Initialize map; canvas renders thousands of markers much faster than DOM icons
+    const map = L.map('map', { preferCanvas: true }).setView([41.7167, 44.7833], 7);
+
+    L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+        attribution: '© OpenStreetMap contributors'
+    }).addTo(map);
+
+    function categoryLabel(code) {
+        const choice = categories[code];
+        if (!choice) return "";
+        return lang === 'en' ? choice[0] : choice[1];
+    }
+
+    function popupContent(id, code) {
+        const box = document.createElement('div');
+        const title = document.createElement('b');
+        title.textContent = '…';
+        const category = document.createElement('div');
+        category.className = 'text-muted small';
+        category.textContent = categoryLabel(code);
+        const link = document.createElement('a');
+        link.href = el.dataset.placeUrl + id;
+        link.textContent = viewText;
+        box.append(title, category, link);
+
+        // the name is only fetched when the popup is opened
+        fetch(el.dataset.pointUrl + id, { credentials: 'same-origin' })
+            .then(response => response.ok ? response.json() : Promise.reject(response.status))
+            .then(place => {
+                title.textContent = place.name;
+                link.href = place.url;
+            })
+            .catch(() => { title.textContent = ''; });
+        return box;
+    }
+
+    function addMarkers(view, start, count) {
+        const layer = L.layerGroup();
+        for (let i = start; i < start + count; i++) {
+            const offset = i * RECORD_SIZE;
+            const id = view.getUint32(offset, true);
+            const lat = view.getFloat32(offset + 4, true);
+            const lon = view.getFloat32(offset + 8, true);
+            const code = view.getUint8(offset + 12);
+            L.circleMarker([lat, lon], { radius: 6, color: '#2e7d32', fillOpacity: 0.8 })
+                .bindPopup(() => popupContent(id, code))
+                .addTo(layer);
+        }
+        layer.addTo(map);
+    }
+
+    fetch(el.dataset.pointsUrl, { credentials: 'same-origin' })
+        .then(response => response.ok ? response.arrayBuffer() : Promise.reject(response.status))
+        .then(buffer => {
+            const view = new DataView(buffer);
+            const total = Math.floor(buffer.byteLength / RECORD_SIZE);
+            if (total === 0) {
+                L.popup().setLatLng([41.7167, 44.7833]).setContent('<b>' + noPlacesText + '</b>').openOn(map);
+                return;
+            }
+            // add markers in batches so the first ones show up right away
+            let start = 0;
+            (function next() {
+                const count = Math.min(BATCH, total - start);
+                addMarkers(view, start, count);
+                start += count;
+                if (start < total) requestAnimationFrame(next);
+            })();
+        });
+
+    // Animations
+    function animateOnScroll() {
+        const sections = document.querySelectorAll('.hero-section, .map-container');
+        const triggerBottom = window.innerHeight * 0.85;
+
+        sections.forEach(section => {
+            const sectionTop = section.getBoundingClientRect().top;
+            if (sectionTop < triggerBottom) {
+                section.classList.add('show');
+            }
+        });
+    }
+
+    function showAddPlaceButton() {
+        const addButton = document.querySelector('.add-place-btn');
+        if (addButton) {
+            setTimeout(() => {
+                addButton.classList.add('show');
+            }, 200);
+        }
+    }
+
+    window.addEventListener('scroll', animateOnScroll);
+    animateOnScroll();
+    showAddPlaceButton();
+})();
@@ -0,0 +1,208 @@
+"""Storage for uploaded images.
+
+Views hand an uploaded FileStorage to ``storage.save()`` and templates build
+links with ``upload_url(name)``. Uploads are streamed to a temporary file in
+chunks; the size limit and the image type (checked from the file's first
+bytes, not its extension) are enforced while streaming, and the finished
+file is moved into place atomically, so a half-written upload is never
+visible.
+
+Config:
+    UPLOAD_STORAGE      "local" (default) or "s3"
+    UPLOAD_FOLDER       directory for local storage
+    UPLOAD_MAX_BYTES    per-file limit (default 8 MB); MAX_CONTENT_LENGTH
+                        caps the whole request
+    UPLOAD_SENDFILE     local only: "x-accel" (nginx) or "x-sendfile"
+                        (Apache/lighttpd) to let the web server send the
+                        bytes; unset serves them as static files
+    UPLOAD_ACCEL_PREFIX internal nginx location for X-Accel-Redirect
+    S3_BUCKET, S3_ENDPOINT_URL, S3_REGION, S3_PUBLIC_URL, S3_URL_EXPIRES
+                        for "s3"; S3_ENDPOINT_URL points it at MinIO or any
+                        other S3-compatible server (e.g. a local stand-in)
+"""
+import os
+import tempfile
+import uuid
+
+from flask import current_app, url_for, abort, send_from_directory
+from werkzeug.utils import secure_filename
+
+CHUNK_SIZE = 64 * 1024
+
+# magic bytes -> extension
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": "jpg",
+    b"\x89PNG\r\n\x1a\n": "png",
+}
+
+
+class UploadError(ValueError):
+    pass
+
+
+def _sniff(head):
+    for signature, extension in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def stream_to_tempfile(file_storage, directory, max_bytes):
+    """Copy the upload into a temp file, enforcing size and type as it goes.
+
+    Returns (temp path, detected extension).
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+    size = 0
+    extension = None
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = file_storage.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if extension is None:
+                    extension = _sniff(chunk)
+                    if extension is None:
+                        raise UploadError("Only JPEG and PNG images are allowed.")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError(f"Image is larger than {max_bytes // (1024 * 1024)} MB.")
+                out.write(chunk)
+        if size == 0:
+            raise UploadError("Empty file.")
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path, extension
+
+
+def new_name(original, extension):
+    stem = os.path.splitext(secure_filename(original or ""))[0][:60] or "image"
+    return f"{uuid.uuid4().hex[:12]}_{stem}.{extension}"
+
+
+class LocalStorage:
+    def __init__(self, folder, sendfile=None, accel_prefix="/protected-uploads/"):
+        self.folder = folder
+        self.sendfile = sendfile
+        self.accel_prefix = accel_prefix
+        os.makedirs(folder, exist_ok=True)
+
+    def save(self, file_storage, max_bytes):
+        tmp_path, extension = stream_to_tempfile(file_storage, self.folder, max_bytes)
+        name = new_name(file_storage.filename, extension)
+        os.replace(tmp_path, os.path.join(self.folder, name))
+        return name
+
+    def delete(self, name):
+        try:
+            os.remove(os.path.join(self.folder, os.path.basename(name)))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def url(self, name):
+        if self.sendfile:
+            return url_for("uploaded_file", name=name)
+        return url_for("static", filename="uploads/" + name)
+
+    def serve(self, name):
+        name = os.path.basename(name)
+        path = os.path.join(self.folder, name)
+        if not os.path.isfile(path):
+            abort(404)
+        if self.sendfile not in ("x-accel", "x-sendfile"):
+            # no front end to hand the file to: send it ourselves
+            response = send_from_directory(self.folder, name, max_age=31536000)
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+            return response
+
+        response = current_app.response_class(status=200)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        if self.sendfile == "x-accel":
+            response.headers["X-Accel-Redirect"] = self.accel_prefix + name
+        else:
+            # consumed by Apache/lighttpd, never passed on to the client
+            response.headers["X-Sendfile"] = path
+        # let the web server pick the type from the file it sends
+        response.headers.pop("Content-Type", None)
+        return response
+
+
+class S3Storage:
+    def __init__(self, bucket, endpoint_url=None, region=None, public_url=None, url_expires=3600):
+        import boto3  # optional dependency, only needed for this backend
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self.bucket = bucket
+        self.public_url = public_url
+        self.url_expires = url_expires
+
+    def save(self, file_storage, max_bytes):
+        tmp_path, extension = stream_to_tempfile(file_storage, None, max_bytes)
+        name = new_name(file_storage.filename, extension)
+        try:
+            # S3 objects only become visible once the upload completes
+            self.client.upload_file(tmp_path, self.bucket, name, ExtraArgs={
+                "ContentType": "image/png" if extension == "png" else "image/jpeg",
+                "CacheControl": "public, max-age=31536000, immutable",
+            })
+        finally:
+            os.unlink(tmp_path)
+        return name
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=name)
+        return True
+
+    def url(self, name):
+        if self.public_url:
+            return f"{self.public_url.rstrip('/')}/{name}"
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": name}, ExpiresIn=self.url_expires)
+
+    def serve(self, name):
+        abort(404)
+
+
+def create_storage(config):
+    kind = config["UPLOAD_STORAGE"]
+    if kind == "local":
+        return LocalStorage(config["UPLOAD_FOLDER"], config["UPLOAD_SENDFILE"], config["UPLOAD_ACCEL_PREFIX"])
+    if kind == "s3":
+        return S3Storage(config["S3_BUCKET"], config.get("S3_ENDPOINT_URL"), config.get("S3_REGION"),
+                         config.get("S3_PUBLIC_URL"), config.get("S3_URL_EXPIRES", 3600))
+    raise ValueError(f"Unknown UPLOAD_STORAGE: {kind}")
+
+
+def get_storage():
+    return current_app.extensions["upload_storage"]
+
+
+def save_upload(file_storage):
+    """Store an uploaded image and return its name, or None when nothing was uploaded."""
+    if not file_storage or not file_storage.filename:
+        return None
+    return get_storage().save(file_storage, current_app.config["UPLOAD_MAX_BYTES"])
+
+
+def upload_url(name):
+    if not name:
+        return url_for("static", filename="img/placeholder.png")
+    return get_storage().url(name)
+
+
+def init_app(app):
+    app.config.setdefault("UPLOAD_STORAGE", "local")
+    app.config.setdefault("UPLOAD_MAX_BYTES", 8 * 1024 * 1024)
+    if app.config.get("MAX_CONTENT_LENGTH") is None:
+        app.config["MAX_CONTENT_LENGTH"] = 10 * 1024 * 1024
+    app.config.setdefault("UPLOAD_SENDFILE", None)
+    app.config.setdefault("UPLOAD_ACCEL_PREFIX", "/protected-uploads/")
+
+    app.extensions["upload_storage"] = create_storage(app.config)
+    app.jinja_env.globals["upload_url"] = upload_url
+
+    @app.route("/uploads/<path:name>")
+    def uploaded_file(name):
+        return get_storage().serve(name)
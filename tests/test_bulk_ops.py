@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+import bulk_ops
+import user_stats
+from bench.datagen import generate
+from forms import REGION_CHOICES
+from models import db, BulkJob, UserStats
+
+
+def _stats():
+    return {row.user_id: (row.places_added, row.ratings_given, round(row.stars_given, 6), row.favorites,
+                          row.planned_routes)
+            for row in UserStats.query}
+
+
+def test_stats_after_bulk_delete_match_a_rebuild(app):
+    generate(300)
+    region = REGION_CHOICES[0][0]
+    assert bulk_ops.run(bulk_ops.DELETE, bulk_ops.place_filters(region=region), batch_size=50) > 0
+    after_delete = _stats()
+
+    result = app.test_cli_runner().invoke(user_stats.rebuild_user_stats_command)
+    assert result.exit_code == 0
+    db.session.expire_all()
+    assert _stats() == after_delete
+
+
+def test_job_that_stopped_reporting_is_marked_failed(app):
+    long_ago = datetime.utcnow() - bulk_ops.JOB_TIMEOUT - timedelta(minutes=1)
+    db.session.add_all([
+        BulkJob(id="stale", action=bulk_ops.DELETE, filters={}, status="running", updated_at=long_ago),
+        BulkJob(id="alive", action=bulk_ops.DELETE, filters={}, status="running"),
+    ])
+    db.session.commit()
+
+    assert bulk_ops.get_job("stale")["status"] == "failed"
+    assert bulk_ops.get_job("alive")["status"] == "running"
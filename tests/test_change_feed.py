@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+import change_feed
+from models import db, ChangeOutbox, ChangeCursor
+
+
+def _write(session, outbox_id):
+    session.add(ChangeOutbox(id=outbox_id, entity="place", entity_id=str(outbox_id), op=change_feed.INSERT,
+                             created_at=datetime.utcnow()))
+
+
+def _consume(seen, **kwargs):
+    return change_feed.consume("test", lambda events: seen.extend(event.revision for event in events), **kwargs)
+
+
+def test_change_committed_below_the_cursor_is_not_skipped(app):
+    seen = []
+    _write(db.session, 1)
+    db.session.commit()
+    _consume(seen)
+
+    # writer A got id 2, writer B got id 3 but commits first
+    writer_a, writer_b = Session(db.engine), Session(db.engine)
+    _write(writer_b, 3)
+    writer_b.commit()
+    _consume(seen)
+    assert seen == [1, 3]
+
+    _write(writer_a, 2)
+    writer_a.commit()
+    _consume(seen)
+    assert seen == [1, 3, 2]
+
+    # delivered once
+    _consume(seen)
+    assert seen == [1, 3, 2]
+    writer_a.close()
+    writer_b.close()
+
+
+def test_gap_from_a_rolled_back_write_expires(app):
+    seen = []
+    _write(db.session, 1)
+    _write(db.session, 3)
+    db.session.commit()
+    _consume(seen, now=1000)
+    assert db.session.get(ChangeCursor, "test").gaps == {"2": 1000}
+
+    _consume(seen, now=1000 + change_feed.GAP_TIMEOUT)
+    assert db.session.get(ChangeCursor, "test").gaps == {}
+    assert seen == [1, 3]
@@ -0,0 +1,17 @@
+from models import db, Place
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+def test_session_pages_are_not_compressed(client):
+    response = client.get("/categories?q=" + "x" * 2000, headers=GZIP)
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+
+
+def test_json_is_compressed(client):
+    db.session.add_all([Place(name=f"ტბა {i}", description="ლამაზი", latitude=42.0, longitude=44.0)
+                        for i in range(200)])
+    db.session.commit()
+    response = client.get("/map/points?format=ndjson", headers=GZIP)
+    assert response.headers["Content-Encoding"] == "gzip"
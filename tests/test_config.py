@@ -0,0 +1,17 @@
+import pytest
+
+from app import create_app
+from config import ProductionConfig
+
+
+def test_production_refuses_to_start_without_secret_key(monkeypatch):
+    monkeypatch.setattr(ProductionConfig, "SECRET_KEY", None)
+    with pytest.raises(RuntimeError, match="SECRET_KEY"):
+        create_app("production")
+
+
+def test_production_is_not_debug(monkeypatch):
+    monkeypatch.setattr(ProductionConfig, "SECRET_KEY", "production-key")
+    app = create_app("production")
+    assert not app.debug
+    assert app.config["SECRET_KEY"] == "production-key"
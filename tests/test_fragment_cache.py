@@ -0,0 +1,13 @@
+from models import db, Place, PlaceTranslation
+
+
+def test_card_shows_translation_stored_after_first_render(client):
+    place = Place(name="ცისფერი ტბა", description="ლამაზი", category="lakes")
+    db.session.add(place)
+    db.session.commit()
+    client.set_cookie("lang", "en")
+    assert "ცისფერი ტბა" in client.get("/categories").get_data(as_text=True)
+
+    db.session.add(PlaceTranslation(place_id=place.id, lang="en", name="Blue Lake", description="Nice"))
+    db.session.commit()
+    assert "Blue Lake" in client.get("/categories").get_data(as_text=True)
@@ -0,0 +1,36 @@
+import json
+
+from forms import CATEGORY_CHOICES
+from models import db, Place
+
+
+def _add_place(category, **kwargs):
+    place = Place(name="ტბა", description="ლამაზი", category=category, latitude=42.0, longitude=44.0, **kwargs)
+    db.session.add(place)
+    db.session.commit()
+    return place
+
+
+def _points(client, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.get("/map/points?format=ndjson", headers=headers)
+
+
+def test_new_place_reusing_a_deleted_id_changes_the_version(client):
+    first, second = CATEGORY_CHOICES[0][0], CATEGORY_CHOICES[1][0]
+    _add_place(first)
+    place = _add_place(first)
+    response = _points(client)
+    etag = response.headers["ETag"]
+    assert _points(client, etag).status_code == 304
+
+    place_id = place.id
+    db.session.delete(place)
+    db.session.commit()
+    assert _add_place(second, id=place_id).id == place_id
+
+    response = _points(client, etag)
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert rows[-1][0] == place_id
+    assert rows[-1][3] == 1
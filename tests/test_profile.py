@@ -0,0 +1,15 @@
+import pytest
+
+from models import db, Place
+
+
+@pytest.mark.parametrize("lang", ["en", "ge", "ru"])
+def test_profile_shows_activity_in_any_language(client, user, lang):
+    db.session.add(Place(name="ტბა", description="ლამაზი", category="lakes", user_id=user.id))
+    db.session.commit()
+
+    client.set_cookie("lang", lang)
+    response = client.get("/profile")
+    assert response.status_code == 200
+    label = "Added" if lang == "en" else "დაამატა"
+    assert label in response.get_data(as_text=True)
@@ -0,0 +1,66 @@
+from sqlalchemy.orm import Session
+
+import ratings
+from models import db, Place, Rating
+
+
+def _place():
+    place = Place(name="ტბა", description="ლამაზი")
+    db.session.add(place)
+    db.session.commit()
+    return place
+
+
+def _rate(client, place, stars, token):
+    return client.post(f"/place/{place.id}", data={"action": "rating", "stars": stars, "comment": "",
+                                                   "idempotency_key": token})
+
+
+def test_submitting_again_updates_the_rating(app, user):
+    place = _place()
+    ratings.submit_rating(user.id, place.id, 2, "ok", token="a")
+    ratings.submit_rating(user.id, place.id, 4, "good", token="b")
+    db.session.commit()
+
+    rating = Rating.query.filter_by(user_id=user.id, place_id=place.id).one()
+    assert (rating.stars, rating.comment) == (4, "good")
+    assert (place.rating, place.rating_count) == (4, 1)
+
+
+def test_repeated_token_is_ignored(client, user):
+    place = _place()
+    _rate(client, place, 3, "first")
+    _rate(client, place, 5, "first")
+    assert db.session.scalar(db.select(Rating.stars)) == 3
+
+
+def test_older_token_arriving_after_a_newer_one_is_ignored(client, user):
+    place = _place()
+    _rate(client, place, 3, "older")
+    _rate(client, place, 5, "newer")
+    # the retry of the first request arrives last
+    _rate(client, place, 3, "older")
+    assert db.session.scalar(db.select(Rating.stars)) == 5
+
+
+def test_concurrent_insert_falls_back_to_update(app, user, monkeypatch):
+    place = _place()
+    lookups = []
+
+    def rating_of(user_id, place_id):
+        lookups.append(place_id)
+        if len(lookups) == 1:
+            # another request inserts the rating between our lookup and insert
+            with Session(db.engine) as other:
+                other.add(Rating(user_id=user_id, place_id=place_id, stars=1, submission_tokens=["other"]))
+                other.commit()
+            return None
+        return Rating.query.filter_by(user_id=user_id, place_id=place_id).first()
+
+    monkeypatch.setattr(ratings, "_rating_of", rating_of)
+    ratings.submit_rating(user.id, place.id, 4, None, token="mine")
+    db.session.commit()
+
+    rating = Rating.query.filter_by(user_id=user.id, place_id=place.id).one()
+    assert rating.stars == 4
+    assert rating.submission_tokens == ["other", "mine"]
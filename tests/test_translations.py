@@ -0,0 +1,17 @@
+import translations
+from models import db, Place, PlaceTranslation
+
+
+def test_place_is_not_stored_when_its_description_fails(app, monkeypatch):
+    place = Place(name="ტბა", description="ლამაზი")
+    db.session.add(place)
+    db.session.commit()
+
+    monkeypatch.setattr(translations, "translate", lambda text, lang: None if text == "ლამაზი" else "Lake")
+    assert translations.store(place_ids=[place.id]) == 0
+    assert db.session.get(PlaceTranslation, (place.id, "en")) is None
+
+    monkeypatch.setattr(translations, "translate", lambda text, lang: {"ტბა": "Lake", "ლამაზი": "Nice"}[text])
+    result = app.test_cli_runner().invoke(translations.translate_content_command)
+    assert "Translated 1 row(s)." in result.output
+    assert db.session.get(PlaceTranslation, (place.id, "en")).description == "Nice"
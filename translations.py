@@ -0,0 +1,179 @@
+"""Per-language place and rating content.
+
+Places and ratings are written in the source language (usually Georgian).
+Their English name/description/comment are stored in place_translation and
+rating_translation.
+
+Views commit first and then call translate_later(), which calls the
+translator in a background thread and stores the result in a short
+transaction of its own. Until then pages show the source text.
+
+Views load the text for the page language in SQL::
+
+    Place.query.options(*place_options(g.lang))
+
+and templates use place.display_name / display_description and
+rating.display_comment, which fall back to the source text when there is no
+translation (yet).
+
+Config:
+    CONTENT_TRANSLATION   translate after writes (default True); when off, or
+                          when the translator fails, ``flask
+                          translate-content`` fills the gaps later
+"""
+import threading
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select, delete, func, or_, exists
+from sqlalchemy.orm import with_expression
+
+import instrumentation
+from models import db, Place, Rating, PlaceTranslation, RatingTranslation
+
+# languages stored in the side tables; anything else shows the source text
+LANGUAGES = ("en",)
+
+
+def translate(text, target):
+    """Machine-translate text, or None when the translator is unavailable."""
+    if not text:
+        return text
+    try:
+        from deep_translator import GoogleTranslator
+        with instrumentation.timed("translate"):
+            return GoogleTranslator(source="auto", target=target).translate(text)
+    except Exception as e:
+        current_app.logger.warning("Translation failed: %s", e)
+        return None
+
+
+def _enabled():
+    return current_app.config.get("CONTENT_TRANSLATION", True)
+
+
+def _sources(place_ids, rating_ids):
+    places = db.session.execute(
+        select(Place.id, Place.name, Place.description).where(Place.id.in_(place_ids))).all() if place_ids else []
+    ratings = db.session.execute(
+        select(Rating.id, Rating.comment).where(Rating.id.in_(rating_ids))).all() if rating_ids else []
+    return ({row.id: (row.name, row.description) for row in places},
+            {row.id: row.comment for row in ratings})
+
+
+def store(place_ids=(), rating_ids=(), langs=LANGUAGES):
+    """Translate places and ratings and store the results; commits.
+
+    The source text is read and the read transaction ended before calling
+    the translator, and the results are written in one short transaction,
+    skipping rows whose text changed in the meantime. A translation that
+    can't be made now (for a place: of its name or of its description) is
+    not stored, so ``flask translate-content`` picks the row up again. Returns the number of rows translated.
+    """
+    places, ratings = _sources(place_ids, rating_ids)
+    db.session.commit()
+
+    place_rows, rating_rows = [], []
+    for lang in langs:
+        for place_id, (name, description) in places.items():
+            translated_name = translate(name, lang)
+            translated_description = translate(description, lang) if translated_name is not None else None
+            if translated_name is not None and translated_description is not None:
+                place_rows.append(PlaceTranslation(place_id=place_id, lang=lang, name=translated_name,
+                                                   description=translated_description))
+        for rating_id, comment in ratings.items():
+            translated = translate(comment, lang) if comment else None
+            if translated is not None:
+                rating_rows.append(RatingTranslation(rating_id=rating_id, lang=lang, comment=translated))
+
+    current_places, current_ratings = _sources([row.place_id for row in place_rows],
+                                               [row.rating_id for row in rating_rows])
+    stored = 0
+    for row in place_rows:
+        if current_places.get(row.place_id) == places[row.place_id]:
+            db.session.merge(row)
+            stored += 1
+    for row in rating_rows:
+        if row.rating_id in current_ratings and current_ratings[row.rating_id] == ratings[row.rating_id]:
+            db.session.merge(row)
+            stored += 1
+    db.session.commit()
+    return stored
+
+
+def translate_later(place_ids=(), rating_ids=()):
+    """Translate freshly committed places/ratings in a background thread."""
+    if not _enabled() or not (place_ids or rating_ids):
+        return
+
+    def work(app):
+        with app.app_context():
+            try:
+                store(list(place_ids), list(rating_ids))
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Translating content failed")
+
+    app = current_app._get_current_object()
+    threading.Thread(target=work, args=(app,), daemon=True).start()
+
+
+def forget_places(place_ids):
+    if place_ids:
+        db.session.execute(delete(PlaceTranslation).where(PlaceTranslation.place_id.in_(place_ids)))
+
+
+def forget_ratings(rating_ids):
+    if rating_ids:
+        db.session.execute(delete(RatingTranslation).where(RatingTranslation.rating_id.in_(rating_ids)))
+
+
+def place_options(lang):
+    """Loader options that fill Place.local_name / local_description for lang."""
+    if lang not in LANGUAGES:
+        return []
+    name = select(PlaceTranslation.name).where(
+        PlaceTranslation.place_id == Place.id, PlaceTranslation.lang == lang).scalar_subquery()
+    description = select(PlaceTranslation.description).where(
+        PlaceTranslation.place_id == Place.id, PlaceTranslation.lang == lang).scalar_subquery()
+    return [with_expression(Place.local_name, name),
+            with_expression(Place.local_description, description)]
+
+
+def rating_options(lang):
+    if lang not in LANGUAGES:
+        return []
+    comment = select(RatingTranslation.comment).where(
+        RatingTranslation.rating_id == Rating.id, RatingTranslation.lang == lang).scalar_subquery()
+    return [with_expression(Rating.local_comment, comment)]
+
+
+def name_matches(pattern, lang):
+    """Filter for places whose source or page-language name matches an ILIKE pattern."""
+    if lang not in LANGUAGES:
+        return Place.name.ilike(pattern)
+    return or_(Place.name.ilike(pattern), exists().where(
+        PlaceTranslation.place_id == Place.id, PlaceTranslation.lang == lang,
+        PlaceTranslation.name.ilike(pattern)))
+
+
+@click.command("translate-content")
+@click.option("--limit", default=500, show_default=True, help="Max places and ratings per language.")
+@with_appcontext
+def translate_content_command(limit):
+    """Translate places and ratings that have no stored translation yet."""
+    done = 0
+    for lang in LANGUAGES:
+        place_ids = db.session.scalars(select(Place.id).where(~exists().where(
+            PlaceTranslation.place_id == Place.id, PlaceTranslation.lang == lang)).limit(limit)).all()
+        rating_ids = db.session.scalars(select(Rating.id).where(
+            Rating.comment.isnot(None), func.length(Rating.comment) > 0, ~exists().where(
+                RatingTranslation.rating_id == Rating.id, RatingTranslation.lang == lang)).limit(limit)).all()
+        done += store(place_ids, rating_ids, langs=(lang,))
+    click.echo(f"Translated {done} row(s).")
+
+
+def init_app(app):
+    app.config.setdefault("CONTENT_TRANSLATION", True)
+    app.cli.add_command(translate_content_command)
@@ -0,0 +1,112 @@
+"""Cached, read-only snapshot of the logged-in user.
+
+current_user is a small immutable UserSnapshot held in a short-TTL LRU, so
+templates never lazy-load the user's favorites or routes. Every request
+reads the user's row version (user.cache_version, plus is_admin) by primary
+key; invalidate() bumps it in the writer's transaction, so once that commits
+every session on every worker reloads the snapshot, and a deleted user is
+logged out at once.
+
+Views that need to modify the user load the ORM row with ``current_user.orm()``.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from flask_login import UserMixin
+from sqlalchemy import select, update, func
+
+from models import db, User, PlannedRoute, favorites_table
+
+@dataclass(frozen=True, eq=False)
+class UserSnapshot(UserMixin):
+    id: int
+    username: str
+    email: str
+    is_admin: bool
+    favorite_ids: frozenset
+    planned_count: int
+
+    def orm(self):
+        """The real User row, for views that write."""
+        return db.session.get(User, self.id)
+
+
+def load_snapshot(user_id):
+    row = db.session.execute(
+        select(User.id, User.username, User.email, User.is_admin,
+               select(func.count(PlannedRoute.id))
+               .where(PlannedRoute.user_id == User.id)
+               .scalar_subquery())
+        .where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+    favorite_ids = db.session.scalars(
+        select(favorites_table.c.place_id).where(favorites_table.c.user_id == user_id)
+    ).all()
+    return UserSnapshot(
+        id=row[0], username=row[1], email=row[2], is_admin=bool(row[3]),
+        favorite_ids=frozenset(favorite_ids), planned_count=row[4],
+    )
+
+
+class UserCache:
+    def __init__(self, maxsize=1024, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault("USER_CACHE_SIZE", self.maxsize)
+        app.config.setdefault("USER_CACHE_TTL", self.ttl)
+        self.maxsize = app.config["USER_CACHE_SIZE"]
+        self.ttl = app.config["USER_CACHE_TTL"]
+
+    def get(self, user_id):
+        version = db.session.execute(
+            select(User.cache_version, User.is_admin).where(User.id == user_id)
+        ).first()
+        if version is None:
+            self.forget(user_id)
+            return None
+        version = tuple(version)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] > now and entry[1] == version:
+                self.entries.move_to_end(user_id)
+                return entry[2]
+
+        snapshot = load_snapshot(user_id)
+        if snapshot is not None and self.ttl > 0:
+            with self.lock:
+                self.entries[user_id] = (now + self.ttl, version, snapshot)
+                self.entries.move_to_end(user_id)
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, *user_ids):
+        """Call when changing users' favorites, routes or profile, before the commit."""
+        user_ids = {user_id for user_id in user_ids if user_id}
+        if not user_ids:
+            return
+        db.session.execute(update(User).where(User.id.in_(user_ids))
+                           .values(cache_version=User.cache_version + 1))
+        for user_id in user_ids:
+            self.forget(user_id)
+
+    def forget(self, user_id):
+        """Drop this process's copy only."""
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache()
@@ -0,0 +1,267 @@
+"""Per-user statistics and activity feed.
+
+user_stats holds counters for every user (places added, ratings given and
+the sum of their stars, favorites, planned routes). They are updated
+incrementally in the same transaction as the write that changed them: an
+after_flush hook turns new/changed/deleted Places, Ratings, PlannedRoutes
+and ORM favorite changes into ``UPDATE ... SET x = x + delta`` statements.
+Set-based writes call favorite_changed(), apply_deltas() or recount()
+themselves.
+
+Every such write also appends a row to the activity table, read newest
+first with keyset paging on (user_id, id), so the profile page needs only
+a few indexed reads however long a user has been around.
+
+``flask rebuild-user-stats`` recomputes every counter from the source
+tables, e.g. after bulk imports.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, select, update, insert, delete, func, inspect, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import attributes
+
+from models import (db, User, Place, Rating, PlannedRoute, UserStats, Activity,
+                    favorites_table)
+
+PLACE_ADDED = "place_added"
+RATED = "rated"
+FAVORITED = "favorited"
+ROUTE_PLANNED = "route_planned"
+
+LABELS = {
+    "en": {PLACE_ADDED: "Added", RATED: "Rated", FAVORITED: "Favorited", ROUTE_PLANNED: "Planned a trip to"},
+    "ge": {PLACE_ADDED: "დაამატა", RATED: "შეაფასა", FAVORITED: "ფავორიტებში დაამატა",
+           ROUTE_PLANNED: "დაგეგმა მარშრუტი:"},
+}
+
+PAGE_SIZE = 20
+
+
+def _counts(user_id):
+    """Exact counters of one user (or, correlated, of every user) from the source tables."""
+    return {
+        "places_added": select(func.count(Place.id)).where(Place.user_id == user_id).scalar_subquery(),
+        "ratings_given": select(func.count(Rating.id)).where(Rating.user_id == user_id).scalar_subquery(),
+        "stars_given": select(func.coalesce(func.sum(Rating.stars), 0)).where(Rating.user_id == user_id).scalar_subquery(),
+        "favorites": select(func.count()).select_from(favorites_table)
+                     .where(favorites_table.c.user_id == user_id).scalar_subquery(),
+        "planned_routes": select(func.count(PlannedRoute.id)).where(PlannedRoute.user_id == user_id).scalar_subquery(),
+    }
+
+
+def _apply(connection, user_id, delta):
+    if not any(delta.values()):
+        return
+    result = connection.execute(
+        update(UserStats).where(UserStats.user_id == user_id)
+        .values({column: getattr(UserStats, column) + value for column, value in delta.items() if value})
+    )
+    if result.rowcount == 0:
+        # no row yet: count from the (already flushed) source tables instead
+        _recount(connection, user_id)
+
+
+def _recount(connection, user_id):
+    counts = _counts(user_id)
+    if connection.execute(update(UserStats).where(UserStats.user_id == user_id).values(counts)).rowcount:
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(insert(UserStats).from_select(
+                ["user_id", *counts], select(User.id, *counts.values()).where(User.id == user_id)))
+    except IntegrityError:
+        # created concurrently; bring it up to date
+        connection.execute(update(UserStats).where(UserStats.user_id == user_id).values(counts))
+
+
+def _append(connection, entries):
+    if entries:
+        now = datetime.utcnow()
+        connection.execute(insert(Activity), [
+            {"user_id": user_id, "kind": kind, "place_id": place_id, "created_at": now}
+            for user_id, kind, place_id in entries
+        ])
+
+
+def _history(obj, key):
+    # never load an attribute from inside a flush
+    return attributes.get_history(obj, key, passive=attributes.PASSIVE_NO_INITIALIZE)
+
+
+def _loaded(obj, key):
+    """Attribute value without triggering a load (None when unloaded)."""
+    return inspect(obj).dict.get(key)
+
+
+def _collect(session):
+    deltas = defaultdict(Counter)
+    recount = set()
+    entries = []
+
+    for obj in session.new:
+        if isinstance(obj, Place) and obj.user_id:
+            deltas[obj.user_id]["places_added"] += 1
+            entries.append((obj.user_id, PLACE_ADDED, obj.id))
+        elif isinstance(obj, Rating) and obj.user_id:
+            deltas[obj.user_id]["ratings_given"] += 1
+            deltas[obj.user_id]["stars_given"] += obj.stars
+            entries.append((obj.user_id, RATED, obj.place_id))
+        elif isinstance(obj, PlannedRoute) and obj.user_id:
+            deltas[obj.user_id]["planned_routes"] += 1
+            entries.append((obj.user_id, ROUTE_PLANNED, obj.place_id))
+        elif isinstance(obj, User):
+            recount.add(obj.id)
+
+    for obj in session.dirty:
+        if isinstance(obj, Rating) and obj.user_id:
+            stars = _history(obj, "stars")
+            if stars.added and stars.deleted:
+                deltas[obj.user_id]["stars_given"] += stars.added[0] - stars.deleted[0]
+            if stars.has_changes() or _history(obj, "comment").has_changes():
+                entries.append((obj.user_id, RATED, obj.place_id))
+        elif isinstance(obj, Place):
+            owner = _history(obj, "user_id")
+            if owner.added or owner.deleted:
+                for user_id in owner.deleted:
+                    if user_id:
+                        deltas[user_id]["places_added"] -= 1
+                for user_id in owner.added:
+                    if user_id:
+                        deltas[user_id]["places_added"] += 1
+        elif isinstance(obj, User):
+            favorites = _history(obj, "favorites")
+            deltas[obj.id]["favorites"] += len(favorites.added) - len(favorites.deleted)
+            entries += [(obj.id, FAVORITED, place.id) for place in favorites.added]
+
+    for obj in session.deleted:
+        user_id = _loaded(obj, "user_id")
+        if isinstance(obj, Place):
+            if user_id:
+                deltas[user_id]["places_added"] -= 1
+            # the flush also deleted the place's rows in the favorites table
+            recount.update(user.id for user in _loaded(obj, "favorited_by") or ())
+        elif isinstance(obj, Rating) and user_id:
+            stars = _loaded(obj, "stars")
+            if stars is None:
+                recount.add(user_id)
+            else:
+                deltas[user_id]["ratings_given"] -= 1
+                deltas[user_id]["stars_given"] -= stars
+        elif isinstance(obj, PlannedRoute) and user_id:
+            deltas[user_id]["planned_routes"] -= 1
+
+    return deltas, recount, entries
+
+
+@event.listens_for(db.session, "after_flush")
+def _after_flush(session, flush_context):
+    deltas, recount, entries = _collect(session)
+    if not (deltas or recount or entries):
+        return
+    connection = session.connection()
+    for user_id, delta in deltas.items():
+        if user_id not in recount:
+            _apply(connection, user_id, delta)
+    for user_id in recount:
+        _recount(connection, user_id)
+    _append(connection, entries)
+
+
+def favorite_changed(user_id, place_id, added):
+    """Record a favorite added/removed with a Core statement."""
+    connection = db.session.connection()
+    _apply(connection, user_id, {"favorites": 1 if added else -1})
+    if added:
+        _append(connection, [(user_id, FAVORITED, place_id)])
+
+
+COUNTERS = ("places_added", "ratings_given", "stars_given", "favorites", "planned_routes")
+
+
+def apply_deltas(deltas):
+    """Add {user_id: {counter: delta}} to many users' counters with one executemany UPDATE.
+
+    Users that have no counters row yet are counted from the source tables.
+    """
+    deltas = {user_id: delta for user_id, delta in deltas.items() if user_id and any(delta.values())}
+    if not deltas:
+        return
+    connection = db.session.connection()
+    connection.execute(
+        update(UserStats).where(UserStats.user_id == bindparam("b_user_id"))
+        .values({column: getattr(UserStats, column) + bindparam(f"b_{column}") for column in COUNTERS}),
+        [{"b_user_id": user_id, **{f"b_{column}": delta.get(column, 0) for column in COUNTERS}}
+         for user_id, delta in deltas.items()],
+    )
+    missing = set(deltas) - set(connection.execute(
+        select(UserStats.user_id).where(UserStats.user_id.in_(deltas))).scalars())
+    for user_id in missing:
+        _recount(connection, user_id)
+
+
+def recount(user_ids):
+    """Recompute the counters of users whose rows were changed in bulk."""
+    connection = db.session.connection()
+    for user_id in set(user_ids):
+        if user_id:
+            _recount(connection, user_id)
+
+
+def forget_user(user_id):
+    """Remove a deleted user's counters and feed, in batches."""
+    while True:
+        ids = db.session.scalars(select(Activity.id).where(Activity.user_id == user_id).limit(1000)).all()
+        if not ids:
+            break
+        db.session.execute(delete(Activity).where(Activity.id.in_(ids)))
+        db.session.commit()
+    db.session.execute(delete(UserStats).where(UserStats.user_id == user_id))
+
+
+def get_stats(user_id):
+    """The user's counters (one primary key read)."""
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        stats = UserStats(user_id=user_id, places_added=0, ratings_given=0, stars_given=0,
+                          favorites=0, planned_routes=0)
+    return stats
+
+
+def activity_page(user_id, before=None, limit=PAGE_SIZE, place_options=()):
+    """Newest activity older than the ``before`` id.
+
+    Returns ([(Activity, Place or None)], next ``before`` or None).
+    """
+    query = (select(Activity, Place).outerjoin(Place, Place.id == Activity.place_id)
+             .where(Activity.user_id == user_id).options(*place_options)
+             .order_by(Activity.id.desc()).limit(limit + 1))
+    if before is not None:
+        query = query.where(Activity.id < before)
+    rows = db.session.execute(query).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, (rows[-1][0].id if more else None)
+
+
+def rebuild_all():
+    """Recompute every user's counters in two statements."""
+    counts = _counts(User.id)
+    db.session.execute(delete(UserStats))
+    db.session.execute(insert(UserStats).from_select(["user_id", *counts], select(User.id, *counts.values())))
+
+
+@click.command("rebuild-user-stats")
+@with_appcontext
+def rebuild_user_stats_command():
+    """Recompute all user statistics from the source tables."""
+    rebuild_all()
+    db.session.commit()
+    click.echo("User statistics rebuilt.")
+
+
+def init_app(app):
+    app.cli.add_command(rebuild_user_stats_command)
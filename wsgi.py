@@ -0,0 +1,12 @@
+"""WSGI entry point: ``gunicorn -c gunicorn.conf.py wsgi:app``.
+
+Uses the production config unless GREENSPOTS_CONFIG says otherwise, so
+SECRET_KEY (and DATABASE_URL) must be set in the server's environment.
+For local ``flask`` commands use ``flask --app app ...``, which builds the
+development app.
+"""
+import os
+
+from app import create_app
+
+app = create_app(os.environ.get("GREENSPOTS_CONFIG", "production"))